@@ -0,0 +1,104 @@
+"""
+Benchmark for gnwrapper.brax
+
+Measure recording overhead of Brax wrappers on CPU.
+
+Usage
+-----
+python benchmark/bench_brax.py [--env ant] [--episode-length N] [--json out.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import jax
+jax.config.update("jax_platform_name", "cpu")
+
+from brax import envs
+import brax.jumpy as jp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from gnwrapper.brax import BraxHTML
+
+
+def _run(env, episode_length, episodes):
+    rng = jp.random_prngkey(seed=42)
+    action = jp.zeros((env.action_size,))
+
+    # Warm up JIT outside of timing
+    rng, rng_use = jp.random_split(rng)
+    state = env.reset(rng_use)
+    state = env.step(state, action)
+    jax.block_until_ready(state.obs)
+
+    t = time.perf_counter()
+    for _ in range(episodes):
+        rng, rng_use = jp.random_split(rng)
+        state = env.reset(rng_use)
+        for _ in range(episode_length):
+            state = env.step(state, action)
+        jax.block_until_ready(state.obs)
+    return episodes * episode_length / (time.perf_counter() - t)
+
+
+def bench_recording(name, episode_length, episodes):
+    """
+    Steps/sec without/with recording, and saved/displayed size
+    """
+    ret = {}
+
+    def make():
+        return envs.create(name, auto_reset=False, episode_length=episode_length)
+
+    raw = make()
+    step, reset = jax.jit(raw.step), jax.jit(raw.reset)
+
+    class _Jit:
+        action_size = raw.action_size
+        def step(self, state, action):
+            return step(state, action)
+        def reset(self, rng):
+            return reset(rng)
+
+    ret["throughput/raw"] = _run(_Jit(), episode_length, episodes)
+
+    with tempfile.TemporaryDirectory() as d:
+        env = BraxHTML(make(), directory=d, video_callable=lambda ep: False)
+        ret["throughput/BraxHTML(off)"] = _run(env, episode_length, episodes)
+
+    for backend in ["html", "mp4", "webp"]:
+        with tempfile.TemporaryDirectory() as d:
+            env = BraxHTML(make(), directory=d, video_callable=lambda ep: True,
+                           backend=backend)
+            ret[f"throughput/BraxHTML({backend})"] = _run(env, episode_length,
+                                                          episodes)
+
+            files = [os.path.join(d, f) for f in os.listdir(d)]
+            ret[f"saved_MiB/BraxHTML({backend})"] = \
+                sum(os.path.getsize(f) for f in files) / 2**20
+    return ret
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gnwrapper.brax")
+    parser.add_argument("--env", default="ant")
+    parser.add_argument("--episode-length", type=int, default=100)
+    parser.add_argument("--episodes", type=int, default=3)
+    parser.add_argument("--json", help="Write results to JSON file")
+    args = parser.parse_args()
+
+    results = bench_recording(args.env, args.episode_length, args.episodes)
+
+    for k, v in results.items():
+        print(f"{k:40s} {v:12.4f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
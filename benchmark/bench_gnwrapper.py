@@ -0,0 +1,246 @@
+"""
+Benchmark for gnwrapper
+
+Measure throughput, memory and display cost of the wrappers with a
+synthetic ``rgb_array`` environment, so that this runs offline.
+
+Usage
+-----
+python benchmark/bench_gnwrapper.py [--steps N] [--json out.json] [--compare base.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest.mock import patch
+
+import numpy as np
+import gym
+from gym import spaces
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import gnwrapper
+
+
+_new_api = gnwrapper._gym_version >= (0, 26, 0)
+
+
+class SyntheticEnv(gym.Env):
+    """
+    Environment drawing a moving square. No physics, no external assets.
+    """
+    metadata = {"render_modes": ["rgb_array"],
+                "render.modes": ["rgb_array"],
+                "render_fps": 30}
+
+    def __init__(self, size=(400, 600), episode_length=200,
+                 render_mode="rgb_array"):
+        self.observation_space = spaces.Box(-1.0, 1.0, (2,), dtype=np.float32)
+        self.action_space = spaces.Discrete(2)
+        self.render_mode = render_mode
+        self.episode_length = episode_length
+
+        self._frame = np.zeros((*size, 3), dtype=np.uint8)
+        self._t = 0
+
+    def _obs(self):
+        return np.array([np.sin(self._t), np.cos(self._t)], dtype=np.float32)
+
+    def reset(self, *, seed=None, options=None):
+        if seed is not None:
+            self.action_space.seed(seed)
+        self._t = 0
+        if _new_api:
+            return self._obs(), {}
+        return self._obs()
+
+    def step(self, action):
+        self._t += 1
+        done = self._t >= self.episode_length
+        if _new_api:
+            return self._obs(), 1.0, done, False, {}
+        return self._obs(), 1.0, done, {}
+
+    def render(self, mode="rgb_array"):
+        h, w, _ = self._frame.shape
+        self._frame[:] = 255
+        x = (self._t * 4) % (w - 20)
+        y = (self._t * 3) % (h - 20)
+        self._frame[y:y+20, x:x+20] = (200, 30, 30)
+        return self._frame.copy()
+
+
+def _run(env, steps, render):
+    env.reset()
+    for _ in range(steps):
+        ret = env.step(env.action_space.sample())
+        if render:
+            env.render()
+        if ret[2] or (len(ret) == 5 and ret[3]):
+            env.reset()
+
+
+class _Collector:
+    """
+    Replacement of ``IPython.display.display`` to measure output size
+    """
+    def __init__(self):
+        self.nbytes = 0
+
+    def __call__(self, *objs, **kwargs):
+        for o in objs:
+            data = getattr(o, "data", o)
+            if isinstance(data, bytes):
+                self.nbytes += len(data)
+            else:
+                self.nbytes += len(str(data))
+
+
+def _quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def bench_throughput(steps):
+    """
+    Steps/sec with and without each wrapper
+    """
+    ret = {}
+    cases = {
+        "raw": (lambda d: SyntheticEnv(), False),
+        "raw+render": (lambda d: SyntheticEnv(), True),
+        "VirtualDisplay": (lambda d: gnwrapper.VirtualDisplay(SyntheticEnv()), True),
+        "Animation": (lambda d: gnwrapper.Animation(SyntheticEnv()), True),
+        "LoopAnimation": (lambda d: gnwrapper.LoopAnimation(SyntheticEnv()), True),
+        "Monitor": (lambda d: gnwrapper.Monitor(SyntheticEnv(), directory=d,
+                                                video_callable=lambda ep: True),
+                    False),
+    }
+    for name, (make, render) in cases.items():
+        with tempfile.TemporaryDirectory() as d, \
+             patch.object(gnwrapper.display, "display", _Collector()), \
+             patch.object(gnwrapper.display, "clear_output", lambda *a, **k: None):
+            env = make(d)
+            with _quiet():
+                t = time.perf_counter()
+                _run(env, steps, render)
+                if isinstance(env, gnwrapper.Monitor):
+                    env._close_running_video()
+                dt = time.perf_counter() - t
+            env.close()
+        ret[f"throughput/{name}"] = steps / dt
+    return ret
+
+
+def bench_memory(steps):
+    """
+    Peak memory for a long episode with buffering wrappers
+    """
+    ret = {}
+    cases = {
+        "LoopAnimation": lambda d: gnwrapper.LoopAnimation(
+            SyntheticEnv(episode_length=steps)),
+        "Monitor": lambda d: gnwrapper.Monitor(
+            SyntheticEnv(episode_length=steps), directory=d,
+            video_callable=lambda ep: True),
+    }
+    for name, make in cases.items():
+        with tempfile.TemporaryDirectory() as d, _quiet():
+            env = make(d)
+            tracemalloc.start()
+            _run(env, steps, isinstance(env, gnwrapper.LoopAnimation))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            if isinstance(env, gnwrapper.Monitor):
+                env._close_running_video()
+            env.close()
+        ret[f"peak_MiB/{name}"] = peak / 2**20
+
+    # ru_maxrss is KiB on Linux, monotonic through the process
+    ret["max_rss_MiB"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+    return ret
+
+
+def bench_display(steps):
+    """
+    Latency and output size of ``display()``
+    """
+    ret = {}
+    with tempfile.TemporaryDirectory() as d, _quiet():
+        loop = gnwrapper.LoopAnimation(SyntheticEnv())
+        _run(loop, steps, True)
+
+        monitor = gnwrapper.Monitor(SyntheticEnv(), directory=d,
+                                    video_callable=lambda ep: True)
+        _run(monitor, steps, False)
+        monitor._close_running_video()
+
+        for name, env in [("LoopAnimation", loop), ("Monitor", monitor)]:
+            collector = _Collector()
+            with patch.object(gnwrapper.display, "display", collector):
+                t = time.perf_counter()
+                env.display()
+                ret[f"display_sec/{name}"] = time.perf_counter() - t
+            ret[f"display_MiB/{name}"] = collector.nbytes / 2**20
+            env.close()
+    return ret
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare with baseline results
+
+    Returns
+    -------
+    regressions : list of str
+        Keys which are worse than baseline by more than ``tolerance``
+    """
+    regressions = []
+    for k, v in results.items():
+        if k not in baseline:
+            continue
+        b = baseline[k]
+        # Only throughput is higher-is-better
+        worse = (v < b * (1 - tolerance)) if k.startswith("throughput/") \
+            else (v > b * (1 + tolerance))
+        if worse:
+            regressions.append(f"{k}: {b:.4g} -> {v:.4g}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gnwrapper")
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--json", help="Write results to JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative regression (default: 0.2)")
+    args = parser.parse_args()
+
+    results = {}
+    for bench in [bench_throughput, bench_memory, bench_display]:
+        results.update(bench(args.steps))
+
+    for k, v in results.items():
+        print(f"{k:40s} {v:12.4f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"Regression: {r}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,37 @@
+import asyncio
 import base64
 import datetime
+import glob
+import html
 import io
+import json
 import os
-from typing import Optional, Callable
+from typing import Optional, Callable, List, Union
 import subprocess
+import threading
+import time
 from unittest.mock import patch
 
 import gym
 from gym import Wrapper
 
-from gym.wrappers import RecordVideo
+from gym.wrappers import RecordVideo, capped_cubic_video_schedule
+from gym.wrappers.monitoring.video_recorder import VideoRecorder
 
 from IPython import display
-import matplotlib.pyplot as plt
 from matplotlib import animation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
+import numpy as np
+from PIL import Image
 from pyvirtualdisplay import Display
 
+from gnwrapper.budget import RecordingBudget
+from gnwrapper.export import save_animation
+from gnwrapper.schedule import CaptureScheduler
+from gnwrapper.stream import MJPEGServer
+
 
 _gym_version = tuple(int(v) for v in gym.__version__.split("."))
 _video_callable_key = "episode_trigger"
@@ -24,33 +40,128 @@ _video_callable_key = "episode_trigger"
 # Render API
 if _gym_version < (0, 26, 0):
     def _render(env, *args, mode=None, **kwargs):
+        _wait_display()
         return env.render(*args, mode="rgb_array", **kwargs)
 else:
     def _render(env, *args, mode=None, **kwargs):
+        _wait_display()
         return env.render(*args, **kwargs)
 
 
+_display_hook: Optional[Callable[[float], None]] = None
+
+
+def set_display_hook(hook: Optional[Callable[[float], None]]):
+    """
+    Set hook called with startup time of virtual display
+
+    Parameters
+    ----------
+    hook : (float) -> None or None
+        Function called with startup time in seconds when Xvfb is ready.
+        ``None`` removes hook.
+    """
+    global _display_hook
+    _display_hook = hook
+
+
+def prewarm(size=(1024, 768)):
+    """
+    Start virtual display on background thread
+
+    Environment construction and Xvfb startup can overlap. Wrappers
+    block only when they render before the display is ready.
+    Setting environment variable ``GNWRAPPER_PREWARM=1`` calls this
+    at import.
+
+    Parameters
+    ----------
+    size : array-like, optional
+        Virtual display size, whose default is (1024, 768)
+    """
+    _VirtualDisplaySingleton(size, background=True)
+
+
+def _wait_display():
+    d = getattr(_VirtualDisplaySingleton, "_instance", None)
+    if d is not None:
+        d.wait()
+
+
+def _video_html(path):
+    video = io.open(path, "r+b").read()
+    encoded = base64.b64encode(video)
+
+    return display.HTML(data="""
+    <video alt="{1}" controls>
+    <source src="data:video/mp4;base64,{0}" type="video/mp4" />
+    </video>
+    """.format(encoded.decode('ascii'), os.path.basename(path)))
+
 
 class _VirtualDisplaySingleton(object):
+    _lock = threading.Lock()
+
     def __new__(cls,*args,**kwargs):
         if not hasattr(cls,"_instance"):
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self,size=(1024, 768)):
+    def __init__(self,size=(1024, 768),*,background=False):
         self.size = size
 
-        if not hasattr(self,"_display"):
+        with self._lock:
+            if hasattr(self,"_ready"):
+                return
+            self._ready = threading.Event()
+            self._error = None
+            self.startup_time = None
+
+        if background:
+            threading.Thread(target=self._start,daemon=True).start()
+        else:
+            self._start()
+            self.wait()
+
+    def _start(self):
+        t = time.perf_counter()
+        try:
             self._display = Display(visible=0,size=self.size)
 
             original = subprocess.Popen
-            def Popen(cmd,pass_fds,stdout,stderr,shell):
-                return original(cmd,pass_fds=pass_fds,
-                                stdout=stdout,stderr=stderr,
-                                shell=shell,preexec_fn=os.setpgrp)
+            starter = threading.get_ident()
+            def Popen(*args,**kwargs):
+                # Other threads can call Popen during background start.
+                if threading.get_ident() == starter:
+                    kwargs["preexec_fn"] = os.setpgrp
+                return original(*args,**kwargs)
 
             with patch("subprocess.Popen",Popen):
                 self._display.start()
+        except BaseException as e:
+            self._error = e
+            self._ready.set()
+            return
+
+        self.startup_time = time.perf_counter() - t
+        self._ready.set()
+        if _display_hook is not None:
+            _display_hook(self.startup_time)
+
+    def wait(self):
+        """
+        Block until display is ready
+
+        Raises
+        ------
+        Exception: When display failed to start
+        """
+        ready = getattr(self,"_ready",None)
+        if ready is None:
+            return
+        ready.wait()
+        if self._error is not None:
+            raise self._error
 
     def _restart_display(self):
         self._display.stop()
@@ -76,11 +187,58 @@ class VirtualDisplay(Wrapper):
         return _render(self.env, mode='rgb_array', **kwargs)
 
 
-class Animation(VirtualDisplay):
+class _ScheduledDisplay(VirtualDisplay):
+    """
+    Base wrapper whose captures are optionally thinned by CaptureScheduler
+
+    Subclasses implement ``_capture()``, and may implement ``_drop()``
+    which is called instead when the scheduler skips a capture.
+    """
+    def __init__(self,env,size=(1024, 768),*,
+                 scheduler: Optional[CaptureScheduler]=None):
+        super().__init__(env,size)
+        self.scheduler = scheduler
+
+    def step(self,action):
+        """
+        Step environment and measure its time for scheduler
+        """
+        if self.scheduler is None:
+            return self.env.step(action)
+
+        t = time.perf_counter()
+        ret = self.env.step(action)
+        self.scheduler.step(time.perf_counter() - t)
+        return ret
+
+    def _capture(self,**kwargs):
+        raise NotImplementedError
+
+    def _drop(self):
+        pass
+
+    def render(self,mode=None,**kwargs):
+        if self.scheduler is None:
+            return self._capture(**kwargs)
+
+        if not self.scheduler.ready():
+            self._drop()
+            return None
+
+        t = time.perf_counter()
+        try:
+            return self._capture(**kwargs)
+        finally:
+            self.scheduler.capture(time.perf_counter() - t)
+
+
+class Animation(_ScheduledDisplay):
     """
     Wrapper for running/rendering OpenAI Gym environment on Notebook
     """
-    def __init__(self,env,size=(1024, 768)):
+    def __init__(self,env,size=(1024, 768),*,
+                 min_interval: float=0.0, double_buffer: bool=False,
+                 scheduler: Optional[CaptureScheduler]=None):
         """
         Wrapping environment for Notebook
 
@@ -90,15 +248,56 @@ class Animation(VirtualDisplay):
             Environment to be wrapped
         size : array-like, optional
             Virtual display size, whose default is (1024,768)
+        min_interval : float, optional
+            Minimum interval of output updates in seconds. Renders within
+            the interval are coalesced and only the latest one is shown.
+            The default is ``0.0``, which updates at every render.
+        double_buffer : bool, optional
+            When ``True``, encode image into back buffer first, and send
+            it only when it differs from the shown one.
+            The default is ``False``.
+        scheduler : gnwrapper.CaptureScheduler, optional
+            Scheduler skipping renders to bound rendering overhead relative
+            to step time. If ``None`` (default), every render is shown.
         """
-        super().__init__(env,size)
+        super().__init__(env,size,scheduler=scheduler)
 
+        self._fig = None
         self._img = None
+        self._handle = None
+        self._min_interval = min_interval
+        self._double_buffer = double_buffer
+        self._last_update = -float("inf")
+        self._pending = False
+        self._front = None
+
+    def _update(self):
+        buf = io.BytesIO()
+        self._fig.savefig(buf, format="png", bbox_inches="tight")
+        back = buf.getvalue()
+        if self._double_buffer:
+            if back == self._front:
+                self._pending = False
+                return
+            self._front = back
+        obj = display.Image(data=back, format="png")
+
+        if self._handle is None:
+            # Outside of IPython, no handle is returned.
+            self._handle = display.display(obj, display_id=True)
+        else:
+            self._handle.update(obj)
+
+        self._last_update = time.perf_counter()
+        self._pending = False
 
     def render(self,mode=None,**kwargs):
         """
         Render the environment on Notebook
 
+        Only its own output is updated, so that the other outputs in the
+        same cell are kept.
+
         Parameters
         ----------
         mode : str
@@ -107,9 +306,12 @@ class Animation(VirtualDisplay):
         Returns
         -------
         img : numpy.ndarray or None
-            Rendering image when mode == "rgb_array"
+            Rendering image when mode == "rgb_array". ``None`` when
+            the render is skipped by ``scheduler``.
         """
-        display.clear_output(wait=True)
+        return super().render(mode,**kwargs)
+
+    def _capture(self,**kwargs):
         _img = _render(self.env, mode='rgb_array', **kwargs)
         if _img is None:
             return
@@ -119,20 +321,46 @@ class Animation(VirtualDisplay):
             _img = _img[-1]
 
         if self._img is None:
-            self._img = plt.imshow(_img)
+            # Own figure outside of pyplot, which is reused for every render
+            self._fig = Figure()
+            FigureCanvasAgg(self._fig)
+            ax = self._fig.add_subplot()
+            ax.axis('off')
+            self._img = ax.imshow(_img)
         else:
             self._img.set_data(_img)
 
-        plt.axis('off')
-        display.display(plt.gcf())
+        if time.perf_counter() - self._last_update < self._min_interval:
+            self._pending = True
+        else:
+            self._update()
 
         return _img
 
-class LoopAnimation(VirtualDisplay):
+    def flush(self):
+        """
+        Show coalesced (not yet shown) image
+        """
+        if self._pending:
+            self._update()
+
+    def close(self):
+        """
+        Flush output, release figure, and close environment
+        """
+        self.flush()
+        if self._fig is not None:
+            self._fig.clear()
+        self._fig = None
+        self._img = None
+        return super().close()
+
+class LoopAnimation(_ScheduledDisplay):
     """
     Wrapper for OpenAI Gym to display loop animation on Notebook
     """
-    def __init__(self,env,size=(1024, 768)):
+    def __init__(self,env,size=(1024, 768),*,
+                 scheduler: Optional[CaptureScheduler]=None):
         """
         Wrap environment for Notebook
 
@@ -142,10 +370,18 @@ class LoopAnimation(VirtualDisplay):
             Environment to be wrapperd
         size : array-like, optional
             Virtual display size, whose default is (1024, 768)
+        scheduler : gnwrapper.CaptureScheduler, optional
+            Scheduler skipping renders to bound rendering overhead relative
+            to step time. Skipped renders extend the previous frame, so
+            that playback timing is kept. If ``None`` (default), every
+            render is stored.
         """
-        super().__init__(env,size)
+        super().__init__(env,size,scheduler=scheduler)
 
         self._img = []
+        self._held = []
+        self._fig = None
+        self._patch = None
 
     def render(self,mode=None,**kwargs):
         """
@@ -159,8 +395,17 @@ class LoopAnimation(VirtualDisplay):
         Returns
         -------
         img : numpy.ndarray or None
-            Rendering image when mode == "rgb_array"
+            Rendering image when mode == "rgb_array". ``None`` when
+            the render is skipped by ``scheduler``.
         """
+        return super().render(mode,**kwargs)
+
+    def _drop(self):
+        # Show previous frame during dropped one, too.
+        if self._held:
+            self._held[-1] += 1
+
+    def _capture(self,**kwargs):
         _img = _render(self.env, mode='rgb_array', **kwargs)
         if _img is None:
             return
@@ -170,23 +415,189 @@ class LoopAnimation(VirtualDisplay):
             self._img.append(_img[-1])
         else:
             self._img.append(_img)
+        self._held.append(1)
 
         return _img
 
+    def _figure(self,dpi):
+        # Own figure outside of pyplot, which is reused for every display
+        shape = self._img[0].shape
+        figsize = (shape[1]/dpi, shape[0]/dpi)
+        if self._fig is None:
+            self._fig = Figure(figsize=figsize, dpi=dpi)
+            FigureCanvasAgg(self._fig)
+            self._fig.add_subplot().axis('off')
+        else:
+            self._fig.set_size_inches(figsize)
+            self._fig.set_dpi(dpi)
+
+        if (self._patch is None) or (self._patch.get_array().shape != shape):
+            if self._patch is not None:
+                self._patch.remove()
+            self._patch = self._fig.axes[0].imshow(self._img[0])
+        else:
+            self._patch.set_data(self._img[0])
+        return self._fig
+
+    def _jshtml(self,dpi,interval):
+        fig = self._figure(dpi)
+        animate = lambda i: self._patch.set_data(self._img[i])
+        # Repeat frames held over dropped ones
+        frames = [i for i, n in enumerate(self._held) for _ in range(n)]
+        ani = animation.FuncAnimation(fig,animate,
+                                      frames=frames,interval=interval)
+        return ani.to_jshtml()
+
     def display(self,*,dpi=72,interval=50):
         """
         Display saved images as loop animation
         """
-        plt.figure(figsize=(self._img[0].shape[1]/dpi,
-                            self._img[0].shape[0]/dpi),
-                   dpi=dpi)
-        patch = plt.imshow(self._img[0])
-        plt.axis('off')
-        animate = lambda i: patch.set_data(self._img[i])
-        ani = animation.FuncAnimation(plt.gcf(),animate,
-                                      frames=len(self._img),interval=interval)
-        display.display(display.HTML(ani.to_jshtml()))
-        plt.close()
+        display.display(display.HTML(self._jshtml(dpi,interval)))
+
+    async def adisplay(self,*,dpi=72,interval=50):
+        """
+        Display saved images as loop animation without blocking event loop
+
+        Encoding runs in the default executor. Don't call ``render()``
+        until this finishes.
+        """
+        loop = asyncio.get_running_loop()
+        jshtml = await loop.run_in_executor(None, self._jshtml, dpi, interval)
+        display.display(display.HTML(jshtml))
+
+    def save(self,path: str,*,interval=50,colors=255):
+        """
+        Save stored images as animated GIF or WebP
+
+        Parameters
+        ----------
+        path : str
+            Output file path. Format is determined by its extension
+            (".gif" or ".webp").
+        interval : float, optional
+            Delay between frames in milliseconds. Frames held over dropped
+            ones are shown longer. The default is ``50``.
+        colors : int, optional
+            Number of palette colors up to ``255``. The default is ``255``.
+
+        See Also
+        --------
+        gnwrapper.export.save_animation
+        """
+        save_animation(self._img, path,
+                       durations=[n * interval for n in self._held],
+                       colors=colors)
+
+    def close(self):
+        """
+        Release figure and close environment
+
+        Stored images are kept, so that they can still be displayed or saved.
+        """
+        if self._fig is not None:
+            self._fig.clear()
+        self._fig = None
+        self._patch = None
+        return super().close()
+
+class Stream(VirtualDisplay):
+    """
+    Wrapper for OpenAI Gym to stream images over local HTTP server as MJPEG
+
+    This works without Notebook, e.g. for headless long-running training.
+    Open ``url`` with browser to watch the environment.
+    """
+    def __init__(self,env,size=(1024, 768),*,
+                 host: str="127.0.0.1",port: int=8080,
+                 fps: float=10,quality: int=75):
+        """
+        Wrap environment and start MJPEG server
+
+        Parameters
+        ----------
+        env : gym.Env
+            Environment to be wrapped
+        size : array-like, optional
+            Virtual display size, whose default is (1024, 768)
+        host : str, optional
+            Host to bind. The default is ``"127.0.0.1"``.
+        port : int, optional
+            Port to bind. ``0`` means any free port. The default is ``8080``.
+        fps : float, optional
+            Maximum capture frame rate. The default is ``10``.
+        quality : int, optional
+            JPEG quality. The default is ``75``.
+
+        Raises
+        ------
+        ValueError: When ``fps`` is not positive
+        """
+        super().__init__(env,size)
+        self.server = MJPEGServer(host, port, fps, quality)
+        self._last_capture = -float("inf")
+
+    @property
+    def url(self):
+        """
+        URL of MJPEG stream
+        """
+        return self.server.url
+
+    def _capture(self):
+        # Render only when someone is watching, at most ``fps``.
+        if self.server.clients == 0:
+            return
+
+        now = time.perf_counter()
+        if now - self._last_capture < 1.0 / self.server.fps:
+            return
+
+        self.render()
+
+    def step(self,action):
+        """
+        Step environment and capture image if clients are connected
+        """
+        ret = self.env.step(action)
+        self._capture()
+        return ret
+
+    def reset(self,**kwargs):
+        """
+        Reset environment and capture image if clients are connected
+        """
+        ret = self.env.reset(**kwargs)
+        self._capture()
+        return ret
+
+    def render(self,mode=None,**kwargs):
+        """
+        Render environment and pass image to MJPEG server
+
+        Returns
+        -------
+        img : numpy.ndarray or None
+            Rendering image
+        """
+        _img = _render(self.env, mode='rgb_array', **kwargs)
+        if _img is None:
+            return
+
+        self._last_capture = time.perf_counter()
+        if isinstance(_img, list):
+            # render_mode: rgb_array_list
+            self.server.push(_img[-1])
+        else:
+            self.server.push(_img)
+
+        return _img
+
+    def close(self):
+        """
+        Stop MJPEG server and close environment
+        """
+        self.server.close()
+        return super().close()
 
 class Monitor(RecordVideo):
     """
@@ -201,7 +612,8 @@ class Monitor(RecordVideo):
     """
     def __init__(self, env, directory: Optional[str] = None, size = (1024, 768),
                  video_callable: Callable[[int], bool] = None,
-                 *args,**kwargs):
+                 *args, budget: Optional[RecordingBudget] = None,
+                 segment_length: int = 0, poster: bool = False, **kwargs):
         """
         Initialize Monitor class
 
@@ -216,6 +628,20 @@ class Monitor(RecordVideo):
             Function to determine whether each episode is recorded or not.
             If ``None`` (default), every 1000 episodes and cubic numbers
             less than 1000 are recorded.
+        budget : RecordingBudget, optional
+            Disk budget for recorded videos. When exceeded, videos are
+            evicted and removed from ``videos``. If ``None`` (default),
+            videos are never deleted.
+        segment_length : int, optional
+            When positive, a recorded episode is split into movies of
+            ``segment_length`` frames, which are listed in
+            "<name>.manifest.json". Finished segments can be displayed
+            while the episode is running. The default is ``0``, which
+            doesn't split.
+        poster : bool, optional
+            When ``True``, a thumbnail of each movie is saved as
+            "<name>.poster.jpg" and listed in ``posters``, which is shown
+            by ``display(gallery=True)``. The default is ``False``.
         *args, **kwargs
             Additional arguments and keyword arguments to be passed to
             base class.
@@ -228,21 +654,173 @@ class Monitor(RecordVideo):
         kwargs[_video_callable_key] = video_callable
         super().__init__(env, directory, *args, **kwargs)
         self.videos = []
+        self.budget = budget
+        self.poster = poster
+        self.posters = {}
+        self.poster_size = (160, 160)
+        self.segment_length = segment_length
+        self._episode_return = 0.0
+
+        self._segments = []
+        self._segment_index = 0
+        self._segment_frames = 0
+        self._manifest = None
+        self._segment_manifest = {}
+        self._segment_metadata = {}
+
+    def _add_video(self, recorder):
+        video = (recorder.path, recorder.metadata_path)
+        self.videos.append(video)
+        if self.poster:
+            poster = self._save_poster(recorder)
+            if poster is not None:
+                self.posters[recorder.path] = poster
+
+        if self._manifest is not None:
+            self._segments.append({"path": os.path.basename(recorder.path),
+                                   "frames": self._segment_frames})
+            if self.budget is not None:
+                # Only needed to remove evicted segment from its manifest
+                self._segment_manifest[recorder.path] = self._manifest
+
+        if self.budget is not None:
+            evicted = self.budget.add(
+                self._budget_files(video),
+                episode=recorder.metadata.get("episode_id", 0),
+                score=self._episode_return)
+            evicted = {v[0] for v in evicted}
+            self.videos = [v for v in self.videos if v[0] not in evicted]
+            for path in evicted:
+                self.posters.pop(path, None)
+                self._forget_segment(path)
+
+    def _budget_files(self, video):
+        # Poster is evicted together with its movie
+        return video + (self.posters.get(video[0]),)
+
+    def _forget_segment(self, path):
+        # Remove evicted segment from its manifest
+        manifest = self._segment_manifest.pop(path, None)
+        if manifest is None:
+            return
+
+        name = os.path.basename(path)
+        if manifest == self._manifest:
+            self._segments = [s for s in self._segments if s["path"] != name]
+            self._write_manifest(False)
+            return
+
+        if not os.path.exists(manifest):
+            return
+        with open(manifest) as f:
+            m = json.load(f)
+        m["segments"] = [s for s in m["segments"] if s["path"] != name]
+        with open(manifest, "w") as f:
+            json.dump(m, f)
+
+    def _write_manifest(self, complete: bool):
+        with open(self._manifest, "w") as f:
+            json.dump({"segments": self._segments,
+                       "complete": complete}, f)
+
+    def start_video_recorder(self):
+        super().start_video_recorder()
+        self._segment_frames = 1
+        if self.segment_length > 0:
+            base = os.path.splitext(self.video_recorder.path)[0]
+            self._manifest = base + ".manifest.json"
+            self._segments = []
+            self._segment_index = 0
+            self._write_manifest(False)
+
+    def _next_segment(self):
+        # Finalize current segment and continue recording into new file
+        if self._segment_frames == 0:
+            return
+
+        recorder = self.video_recorder
+        # gym >= 0.26.0 closes env at ``VideoRecorder.close()``,
+        # but the episode is still running.
+        with patch.object(recorder.env, "close", lambda: None):
+            recorder.close()
+        if recorder.functional:
+            self._add_video(recorder)
+        self._write_manifest(False)
+
+        # Next recorder is created at the next frame by ``_start_segment()``,
+        # so that no empty segment is left when recording stops here.
+        self._segment_metadata = {k: recorder.metadata[k]
+                                  for k in ("step_id", "episode_id")
+                                  if k in recorder.metadata}
+        self.video_recorder = None
+        self._segment_frames = 0
+
+    def _start_segment(self):
+        base = os.path.splitext(self._manifest)[0][:-len(".manifest")]
+        # Count by index, since evicted segments are removed from the list
+        self._segment_index += 1
+        n = self._segment_index
+        self.video_recorder = VideoRecorder(
+            env=self.env, base_path=f"{base}-segment-{n}",
+            metadata={**self._segment_metadata, "segment": n})
+
+    def close_video_recorder(self):
+        if self.video_recorder is None:
+            # Next segment is not started yet
+            self.recording = False
+            self.recorded_frames = 1
+            return
+        super().close_video_recorder()
 
     def _close_running_video(self):
         if self.video_recorder:
             self.close_video_recorder()
-            if self.video_recorder.functional:
-                self.videos.append((self.video_recorder.path,
-                                    self.video_recorder.metadata_path))
+            if self.video_recorder.functional and self._segment_frames > 0:
+                self._add_video(self.video_recorder)
             self.video_recorder = None
+        elif self.recording:
+            self.close_video_recorder()
+
+        if self._manifest is not None:
+            self._write_manifest(True)
+            self._manifest = None
+        self._segment_frames = 0
+
+    def _save_poster(self, recorder):
+        # gym >= 0.26.0 keeps all frames, gym <= 0.25.2 keeps only the last
+        frames = getattr(recorder, "recorded_frames", None)
+        if frames:
+            frame = frames[len(frames)//2]
+        else:
+            frame = getattr(recorder, "last_frame", None)
+
+        if frame is None:
+            return None
+
+        path = os.path.splitext(recorder.path)[0] + ".poster.jpg"
+        img = Image.fromarray(np.asarray(frame)[..., :3])
+        img.thumbnail(self.poster_size)
+        img.save(path, format="JPEG", quality=80)
+        return path
 
     def step(self,action):
         """
         Step Environment
         """
         try:
-            return super().step(action)
+            self._display.wait()
+            recording = self.recording
+            if recording and self.video_recorder is None:
+                self._start_segment()
+            ret = super().step(action)
+            self._episode_return += float(ret[1])
+
+            if recording:
+                self._segment_frames += 1
+                if (self.segment_length > 0 and self.recording and
+                    self._segment_frames >= self.segment_length):
+                    self._next_segment()
+            return ret
         except KeyboardInterrupt:
             self._close_running_video()
             raise
@@ -252,7 +830,9 @@ class Monitor(RecordVideo):
         Reset Environment
         """
         try:
+            self._display.wait()
             self._close_running_video()
+            self._episode_return = 0.0
             return super().reset(**kwargs)
         except KeyboardInterrupt:
             self._close_running_video()
@@ -261,35 +841,334 @@ class Monitor(RecordVideo):
     def render(self, *args, **kwargs):
         return _render(self.env)
 
-    def display(self,reset: bool=False):
+    def close(self):
+        """
+        Flush the current video, complete its manifest, and close environment
+        """
+        self._close_running_video()
+        return super().close()
+
+    def display(self,reset: bool=False,*,gallery: bool=False,columns: int=4):
         """
         Display saved all movies
 
         If video is running, stop and flush the current video then display all.
+        With ``segment_length``, only the running segment is flushed and
+        the episode keeps being recorded.
 
         Parameters
         ----------
         reset : bool, optional
             When `True`, clear current video list. This does not delete movie files.
             The default value is `False`, which keeps video list.
+        gallery : bool, optional
+            When `True`, show grid of movies instead of embedding them.
+            Each movie is loaded from its file only when it is played,
+            so that the notebook stays small. Thumbnails are shown when
+            the monitor is created with ``poster=True``.
+            The default value is `False`.
+        columns : int, optional
+            Number of columns of gallery. The default is ``4``.
+
+        Notes
+        -----
+        Gallery refers movie files by relative path from the current
+        directory, so that ``directory`` should be placed under the
+        notebook directory.
         """
 
-        # Close current video.
-        self._close_running_video()
+        self._flush_video()
 
-        for f in self.videos:
-            if not os.path.exists(f[0]):
-                continue
+        videos = self._displayed_videos()
+        if gallery:
+            display.display(display.HTML(data=self._gallery(videos,
+                                                            self.posters,
+                                                            columns)))
+        else:
+            for f in videos:
+                display.display(os.path.basename(f[0]))
+                display.display(_video_html(f[0]))
 
-            video = io.open(f[0], "r+b").read()
-            encoded = base64.b64encode(video)
+        if reset:
+            self.videos = []
 
-            display.display(os.path.basename(f[0]))
-            display.display(display.HTML(data="""
-            <video alt="{1}" controls>
-            <source src="data:video/mp4;base64,{0}" type="video/mp4" />
-            </video>
-            """.format(encoded.decode('ascii'), os.path.basename(f[0]))))
+    async def adisplay(self,reset: bool=False,*,gallery: bool=False,columns: int=4):
+        """
+        Display saved all movies without blocking event loop
+
+        Flushing video and reading files run in the default executor,
+        and each movie is shown as soon as it is ready.
+        Don't call ``step()`` / ``reset()`` until this finishes.
+
+        Parameters
+        ----------
+        reset : bool, optional
+            When `True`, clear current video list. This does not delete movie files.
+            The default value is `False`, which keeps video list.
+        gallery : bool, optional
+            When `True`, show grid of movies instead of embedding them.
+            The default value is `False`.
+        columns : int, optional
+            Number of columns of gallery. The default is ``4``.
+
+        See Also
+        --------
+        Monitor.display
+        """
+        await self.aflush()
+        loop = asyncio.get_running_loop()
+
+        videos = self._displayed_videos()
+        if gallery:
+            html_ = await loop.run_in_executor(None, self._gallery,
+                                               videos, self.posters, columns)
+            display.display(display.HTML(data=html_))
+        else:
+            for f in videos:
+                video = await loop.run_in_executor(None, _video_html, f[0])
+                display.display(os.path.basename(f[0]))
+                display.display(video)
 
         if reset:
             self.videos = []
+
+    async def aflush(self):
+        """
+        Stop and flush the current video without blocking event loop
+
+        Encoding runs in the default executor.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._flush_video)
+
+    def _flush_video(self):
+        if self.segment_length > 0 and self.recording:
+            # Keep recording the running episode
+            self._next_segment()
+        else:
+            self._close_running_video()
+
+    def _displayed_videos(self):
+        videos = [f for f in self.videos if os.path.exists(f[0])]
+        if self.budget is not None:
+            for f in videos:
+                self.budget.touch(self._budget_files(f))
+        return videos
+
+    @staticmethod
+    def _gallery(videos, posters, columns):
+        items = []
+        for f in videos:
+            poster = ""
+            path = posters.get(f[0])
+            if path is not None and os.path.exists(path):
+                with open(path, "rb") as p:
+                    poster = ('poster="data:image/jpeg;base64,' +
+                              base64.b64encode(p.read()).decode('ascii') + '"')
+
+            # preload="none": Nothing is downloaded until played.
+            items.append("""
+            <figure style="margin: 0">
+            <video controls preload="none" width="100%" {2}>
+            <source src="{0}" type="video/mp4" />
+            </video>
+            <figcaption>{1}</figcaption>
+            </figure>
+            """.format(html.escape(os.path.relpath(f[0])),
+                       html.escape(os.path.basename(f[0])), poster))
+
+        return """
+        <div style="display: grid; grid-template-columns: repeat({0}, 1fr); gap: 8px">
+        {1}
+        </div>
+        """.format(columns, "".join(items))
+
+
+class ReplayMonitor(Wrapper):
+    """
+    Monitor wrapper to store only reset seed and actions of each episode.
+
+    Recording costs almost nothing. Videos are rendered on demand by
+    replaying episodes on a fresh environment at ``display()``, and
+    cached as mp4 files.
+
+    Notes
+    -----
+    Environment must be deterministic under the same seed and actions.
+    Recorded episodes are reset with the given ``seed``, or a random seed
+    when it is not given.
+    """
+    def __init__(self, env, env_fn: Callable[[], gym.Env],
+                 directory: Optional[str] = None, size = (1024, 768),
+                 video_callable: Callable[[int], bool] = None):
+        """
+        Initialize ReplayMonitor class
+
+        Parameters
+        ----------
+        env : gym.Env
+            Environment to be recorded
+        env_fn : () -> gym.Env
+            Function to create fresh environment for replay. The
+            environment must render "rgb_array".
+        directory : str, optional
+            Directory to store action logs and movies. When the value is
+            `None`, which is default, "%Y%m%d-%H%M%S" is used for directory.
+        size : array-like, optional
+            Virtual display size, whose default is (1024, 768)
+        video_callable : (int) -> bool, optional
+            Function to determine whether each episode is recorded or not.
+            If ``None`` (default), every 1000 episodes and cubic numbers
+            less than 1000 are recorded.
+        """
+        super().__init__(env)
+        if directory is None:
+            directory = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        os.makedirs(directory, exist_ok=True)
+
+        self._display = _VirtualDisplaySingleton(size)
+        self._env_fn = env_fn
+        self._directory = directory
+        self._callable = video_callable or capped_cubic_video_schedule
+
+        self._episode = -1
+        self._log = None
+
+    def _path(self, episode: int, ext: str):
+        return os.path.join(self._directory, f"episode-{episode}.{ext}")
+
+    def _write_log(self):
+        if self._log is None:
+            return
+
+        with open(self._path(self._episode, "json"), "w") as f:
+            json.dump(self._log, f)
+        self._log = None
+
+    def reset(self,**kwargs):
+        """
+        Reset Environment
+        """
+        self._write_log()
+        self._episode += 1
+
+        if self._callable(self._episode):
+            if kwargs.get("seed") is None:
+                kwargs["seed"] = int(np.random.SeedSequence().generate_state(1)[0])
+            self._log = {"seed": kwargs["seed"],
+                         "options": kwargs.get("options"),
+                         "actions": []}
+
+            # Remove stale cache
+            mp4 = self._path(self._episode, "mp4")
+            if os.path.exists(mp4):
+                os.remove(mp4)
+
+        return self.env.reset(**kwargs)
+
+    def step(self,action):
+        """
+        Step Environment
+        """
+        ret = self.env.step(action)
+        if self._log is not None:
+            self._log["actions"].append(np.asarray(action).tolist())
+            if ret[2] or (len(ret) == 5 and ret[3]):
+                self._write_log()
+        return ret
+
+    def render(self, *args, **kwargs):
+        return _render(self.env)
+
+    def recorded_episodes(self):
+        """
+        Get Recorded Episodes
+
+        Returns
+        -------
+        episodes : list of int
+            Recorded episodes
+        """
+        self._write_log()
+        logs = glob.glob(os.path.join(self._directory, "episode-*.json"))
+        return sorted([int(h.rsplit("-", maxsplit=1)[-1][:-5]) for h in logs])
+
+    def _replay(self, episode: int):
+        with open(self._path(episode, "json")) as f:
+            log = json.load(f)
+
+        env = self._env_fn()
+        try:
+            reset_kwargs = {"seed": log["seed"]}
+            if log["options"] is not None:
+                reset_kwargs["options"] = log["options"]
+            env.reset(**reset_kwargs)
+
+            frames = [_render(env)]
+            for a in log["actions"]:
+                if isinstance(env.action_space, gym.spaces.Box):
+                    a = np.asarray(a, dtype=env.action_space.dtype)
+                env.step(a)
+                frames.append(_render(env))
+            fps = env.metadata.get("render_fps", 30)
+        finally:
+            env.close()
+
+        frames = [f[-1] if isinstance(f, list) else f for f in frames]
+        path = self._path(episode, "mp4")
+        ImageSequenceClip(frames, fps=fps).write_videofile(path, logger=None)
+        return path
+
+    def video(self, episode: int):
+        """
+        Get movie of episode, rendering it when it is not cached
+
+        Parameters
+        ----------
+        episode : int
+            Recorded episode
+
+        Returns
+        -------
+        path : str
+            Path to mp4 file
+        """
+        self._write_log()
+        path = self._path(episode, "mp4")
+        if not os.path.exists(path):
+            path = self._replay(episode)
+        return path
+
+    def display(self,episodes: Optional[Union[int, List[int]]]=None):
+        """
+        Display movies of recorded episodes
+
+        Parameters
+        ----------
+        episodes: int or list of ints or None
+            Episode number(s) to be displayed.
+            If ``None`` (default), all the episode will be displayed.
+        """
+        if episodes is None:
+            episodes = self.recorded_episodes()
+        else:
+            episodes = np.array(episodes, copy=False, ndmin=1).ravel()
+
+        for e in episodes:
+            if not os.path.exists(self._path(e, "json")):
+                continue
+
+            path = self.video(e)
+            display.display(os.path.basename(path))
+            display.display(_video_html(path))
+
+    def close(self):
+        """
+        Write running log and close environment
+        """
+        self._write_log()
+        return super().close()
+
+
+if os.getenv("GNWRAPPER_PREWARM", "0") not in ("", "0"):
+    prewarm()
@@ -1,10 +1,18 @@
+import asyncio
+import base64
 import datetime
 import glob
+from html import escape
+import json
 import os
+import re
+import uuid
 from typing import Optional, Callable, Union, List
 
 from IPython.display import HTML as dHTML, display as ddisplay
+from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
 import numpy as np
+from PIL import Image
 
 import gym
 
@@ -16,19 +24,26 @@ except ImportError:
     from gym.wrappers.monitor import capped_cubic_video_schedule as default_schedule
 
 import brax
-from brax.io import html
+from brax.io import html, image
 from brax.io.file import File
 from brax.envs import env as benv
 from brax.envs.wrappers import GymWrapper, AutoResetWrapper
 import brax.jumpy as jp
 import jax
 
+from gnwrapper import _video_html
+from gnwrapper.budget import RecordingBudget
+from gnwrapper.export import save_animation
+
 __all__ = ["BraxHTML", "GymHTML"]
 
 
-class _HTML:
+class _Recorder:
+    _ext = None
+
     def __init__(self, sys: brax.System, directory: Optional[str], height: int,
-                 video_callable: Optional[Callable[[int], bool]]):
+                 video_callable: Optional[Callable[[int], bool]],
+                 budget: Optional[RecordingBudget]=None):
         self.sys = sys
         if directory is None:
             directory = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
@@ -40,47 +55,326 @@ class _HTML:
         self._episode = 0
         self._callable = video_callable or default_schedule
         self._qps = []
+        self._return = 0.0
+        self._budget = budget
 
     def record(self, state: benv.State):
         if self._video_enabled():
             self._qps.append(state.qp)
+            self._return += float(state.reward)
             if state.done:
                 self._save()
 
     def reset(self):
         self._episode += 1
         self._qps = []
+        self._return = 0.0
 
     def _video_enabled(self):
         return self._callable(self._episode)
 
+    def _path(self, episode: int):
+        return os.path.join(self._directory, f"episode-{episode}.{self._ext}")
+
+    def _write(self, path: str):
+        raise NotImplementedError
+
     def _save(self):
-        # Call ``render()`` directly, since ``save_html()`` doesn't take ``height``
-        path = os.path.join(self._directory, f"episode-{self._episode}.html")
-        with File(path, 'w') as fout:
-            fout.write(html.render(self.sys, self._qps, self._height))
+        path = self._path(self._episode)
+        self._write(path)
+
+        if self._budget is not None:
+            # Evicted files are deleted, so that ``recorded_episodes()``
+            # follows automatically.
+            self._budget.add((path,), episode=self._episode, score=self._return)
+
+    def flush(self):
+        # Save unfinished episode
+        if self._video_enabled() and len(self._qps) > 0:
+            self._save()
+
+    async def aflush(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.flush)
 
     def recorded_episodes(self):
-        htmls = glob.glob(os.path.join(self._directory, "*.html"))
-        return sorted([int(h.rsplit("-", maxsplit=1)[-1][:-5]) for h in htmls])
+        files = glob.glob(os.path.join(self._directory, f"episode-*.{self._ext}"))
+        n = len(self._ext) + 1
+        return sorted([int(f.rsplit("-", maxsplit=1)[-1][:-n]) for f in files])
 
-    def display(self, episodes: Optional[Union[int, List[int]]]=None):
+    def _files(self, episodes: Optional[Union[int, List[int]]]):
         if episodes is None:
             # Make sure numerically ascending order
             episodes = self.recorded_episodes()
         else:
             episodes = np.array(episodes, copy=False, ndmin=1).ravel()
 
-        htmls = [os.path.join(self._directory, f"episode-{i}.html")
-                 for i in episodes]
+        files = [self._path(i) for i in episodes]
+        files = [f for f in files if os.path.exists(f)]
+
+        if self._budget is not None:
+            for f in files:
+                self._budget.touch((f,))
+
+        return files
+
+    def _read(self, path: str):
+        raise NotImplementedError
+
+    def _combine(self, files: List[str]):
+        raise ValueError("Combined viewer is supported only by html backend")
+
+    def display(self, episodes: Optional[Union[int, List[int]]]=None,
+                combined: bool=False):
+        files = self._files(episodes)
+        if combined:
+            if len(files) > 0:
+                ddisplay(self._combine(files))
+            return
+
+        for f in files:
+            ddisplay(f)
+            ddisplay(self._read(f))
+
+    async def adisplay(self, episodes: Optional[Union[int, List[int]]]=None,
+                       combined: bool=False):
+        loop = asyncio.get_running_loop()
+        files = self._files(episodes)
+        if combined:
+            if len(files) > 0:
+                ddisplay(await loop.run_in_executor(None, self._combine, files))
+            return
+
+        for f in files:
+            obj = await loop.run_in_executor(None, self._read, f)
+            ddisplay(f)
+            ddisplay(obj)
+
+
+_SYSTEM = re.compile(r"var system = (.*?);\s*</script>", re.DOTALL)
+
+# Each episode is shown by brax's own viewer page inside a single iframe.
+# Replacing the iframe document releases the previous viewer as a whole,
+# i.e. its WebGL context, render loop and event listeners, without
+# depending on the viewer internals.
+_COMBINED_HTML = """
+<div>
+  <select id="<!-- id goes here -->-select">
+    <!-- options go here -->
+  </select>
+  <iframe id="<!-- id goes here -->-viewer"
+          style="width: 100%; height: <!-- viewer height goes here -->; border: none;"></iframe>
+</div>
+<script type="application/javascript">
+(() => {
+  const page = <!-- viewer page json goes here -->;
+  const data = <!-- episodes json goes here -->;
+  const select = document.getElementById('<!-- id goes here -->-select');
+  const frame = document.getElementById('<!-- id goes here -->-viewer');
+
+  function show(i) {
+    const ep = data.episodes[i];
+    const system = JSON.stringify({config: data.config, pos: ep.pos,
+                                   rot: ep.rot, debug: false});
+    frame.srcdoc = page.replace('\\x3c!-- system json goes here -->',
+                                () => system);
+  }
+
+  select.addEventListener('change', () => show(select.selectedIndex));
+  show(0);
+})();
+</script>
+"""
+
+
+def _js_json(obj) -> str:
+    # JSON embedded in <script>, which must not contain "</script>" or "<!--"
+    return json.dumps(obj, separators=(",", ":")).replace("<", "\\u003c")
+
+
+class _HTML(_Recorder):
+    _ext = "html"
+
+    def _write(self, path: str):
+        # Call ``render()`` directly, since ``save_html()`` doesn't take ``height``
+        with File(path, 'w') as fout:
+            fout.write(html.render(self.sys, self._qps, self._height))
 
-        for h in htmls:
-            if not os.path.exists(h):
-                continue
+    def _read(self, path: str):
+        with open(path) as hstr:
+            return dHTML(hstr.read())
+
+    def _combine(self, files: List[str]):
+        # System config is shared, so that only trajectories are embedded
+        # for each episode.
+        config = None
+        episodes = []
+        for f in files:
+            with open(f) as hstr:
+                system = json.loads(_SYSTEM.search(hstr.read()).group(1))
+            if config is None:
+                config = system["config"]
+            episodes.append({"pos": system["pos"], "rot": system["rot"]})
+
+        page = html._HTML.replace("<!-- viewer height goes here -->",
+                                  f"{self._height}px")
+        options = "\n    ".join(
+            f"<option>{escape(os.path.basename(f))}</option>" for f in files)
+
+        h = _COMBINED_HTML.replace("<!-- id goes here -->",
+                                   f"brax-viewer-{uuid.uuid4().hex}")
+        h = h.replace("<!-- options go here -->", options)
+        h = h.replace("<!-- viewer height goes here -->", f"{self._height}px")
+        h = h.replace("<!-- viewer page json goes here -->", _js_json(page))
+        h = h.replace("<!-- episodes json goes here -->",
+                      _js_json({"config": config, "episodes": episodes}))
+        return dHTML(h)
+
+
+def _quat_mul(u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    # Batched ``brax.math.quat_mul`` for (N, 4) quaternions
+    return np.stack([
+        u[:, 0]*v[:, 0] - u[:, 1]*v[:, 1] - u[:, 2]*v[:, 2] - u[:, 3]*v[:, 3],
+        u[:, 0]*v[:, 1] + u[:, 1]*v[:, 0] + u[:, 2]*v[:, 3] - u[:, 3]*v[:, 2],
+        u[:, 0]*v[:, 2] - u[:, 1]*v[:, 3] + u[:, 2]*v[:, 0] + u[:, 3]*v[:, 1],
+        u[:, 0]*v[:, 3] + u[:, 1]*v[:, 2] - u[:, 2]*v[:, 1] + u[:, 3]*v[:, 0],
+    ], axis=-1)
+
+
+def _rotate(vec: np.ndarray, quat: np.ndarray) -> np.ndarray:
+    # Batched ``brax.math.rotate`` for (N, 3) vectors and (N, 4) quaternions
+    u, s = quat[:, 1:], quat[:, :1]
+    return (2 * np.sum(u * vec, axis=-1, keepdims=True) * u +
+            (s * s - np.sum(u * u, axis=-1, keepdims=True)) * vec +
+            2 * s * np.cross(u, vec))
+
+
+class _Rasterizer:
+    """
+    Rasterize trajectory with a scene built only once
 
-            ddisplay(h)
-            with open(h) as hstr:
-                ddisplay(dHTML(hstr.read()))
+    ``brax.io.image.render_array()`` rebuilds the whole scene (meshes and
+    instances) at every frame. Here, the scene is built at the first call,
+    and only instance poses and camera are updated for each frame.
+    """
+    def __init__(self, sys: brax.System, width: int, height: int,
+                 ssaa: int=2):
+        self.sys = sys
+        self.width = width
+        self.height = height
+        self.ssaa = ssaa
+
+        self._scene = None
+        self._instances = None
+
+    def _build(self, qp: brax.QP):
+        self._scene, self._instances = image._scene(self.sys, qp)
+
+        # Same order as instances created by ``_scene()``
+        body, off, rot = [], [], []
+        for i, b in enumerate(self.sys.config.bodies):
+            for col in b.colliders:
+                body.append(i)
+                off.append([col.position.x, col.position.y, col.position.z])
+                rot.append(image.math.euler_to_quat(
+                    image.vec_to_arr(col.rotation)))
+        self._body = np.array(body, dtype=int)
+        self._off = np.array(off, dtype=float)
+        self._rot = np.array(rot, dtype=float)
+
+        # Camera keeps its offset from the first body
+        self._eye = np.array(image._eye(self.sys, qp)) - np.asarray(qp.pos[0])
+        self._up = image._up(self.sys)
+
+    def __call__(self, qps: List[brax.QP]) -> List[np.ndarray]:
+        if self._scene is None:
+            self._build(qps[0])
+
+        hfov = 58.0
+        vfov = hfov * self.height / self.width
+
+        frames = []
+        for qp in qps:
+            qpos = np.asarray(qp.pos, dtype=float)
+            qrot = np.asarray(qp.rot, dtype=float)
+            pos = qpos[self._body] + _rotate(self._off, qrot[self._body])
+            rot = _quat_mul(qrot[self._body], self._rot)
+            for inst, p, r in zip(self._instances, pos, rot):
+                self._scene.set_object_position(inst, p.tolist())
+                self._scene.set_object_orientation(inst,
+                                                   [r[1], r[2], r[3], r[0]])
+
+            target = [qpos[0, 0], qpos[0, 1], 0]
+            light = image.Light(direction=[0.57735, -0.57735, 0.57735],
+                                ambient=0.8, diffuse=0.8, specular=0.6,
+                                shadowmap_center=target)
+            camera = image.Camera(viewWidth=self.width * self.ssaa,
+                                  viewHeight=self.height * self.ssaa,
+                                  position=list(qpos[0] + self._eye),
+                                  target=target, up=self._up,
+                                  hfov=hfov, vfov=vfov)
+
+            img = self._scene.get_camera_image(self._instances,
+                                               light, camera).rgb
+            arr = np.reshape(np.array(img, dtype=np.uint8),
+                             (camera.view_height, camera.view_width, -1))
+            if self.ssaa > 1:
+                arr = np.asarray(Image.fromarray(arr).resize((self.width,
+                                                              self.height)))
+            frames.append(arr)
+        return frames
+
+
+class _Video(_Recorder):
+    def __init__(self, sys: brax.System, directory: Optional[str], height: int,
+                 video_callable: Optional[Callable[[int], bool]],
+                 budget: Optional[RecordingBudget]=None,
+                 width: Optional[int]=None, format: str="mp4",
+                 ssaa: int=2):
+        if format not in ("mp4", "webp"):
+            raise ValueError(f"Unknown format: {format}. " +
+                             "Format must be mp4 or webp")
+        super().__init__(sys, directory, height, video_callable, budget)
+        self._width = width or (height * 4 // 3)
+        self._ext = format
+        self._rasterizer = _Rasterizer(sys, self._width, height, ssaa)
+
+    def _frames(self):
+        # Transfer whole trajectory from device at once,
+        # instead of synchronizing every frame.
+        return self._rasterizer(jax.device_get(self._qps))
+
+    def _write(self, path: str):
+        frames = self._frames()
+        dt = float(self.sys.config.dt)
+
+        if self._ext == "webp":
+            save_animation(frames, path, interval=dt * 1000)
+            return
+
+        clip = ImageSequenceClip(frames, fps=1.0 / dt)
+        clip.write_videofile(path, logger=None)
+
+    def _read(self, path: str):
+        if self._ext == "webp":
+            with open(path, "rb") as f:
+                encoded = base64.b64encode(f.read()).decode('ascii')
+            return dHTML(f'<img src="data:image/webp;base64,{encoded}" />')
+
+        return _video_html(path)
+
+
+def _recorder(backend: str, sys: brax.System, directory: Optional[str],
+              height: int, video_callable: Optional[Callable[[int], bool]],
+              budget: Optional[RecordingBudget], width: Optional[int],
+              ssaa: int):
+    if backend == "html":
+        return _HTML(sys, directory, height, video_callable, budget)
+    if backend in ("mp4", "webp"):
+        return _Video(sys, directory, height, video_callable, budget,
+                      width, backend, ssaa)
+    raise ValueError(f"Unknown backend: {backend}. " +
+                     "Backend must be one of html, mp4, webp")
 
 
 def RaiseWhenAutoReset(env):
@@ -93,11 +387,13 @@ def RaiseWhenAutoReset(env):
 
 class BraxHTML(benv.Wrapper):
     """
-    HTML Wrapper to store Brax trajectory as HTML
+    HTML Wrapper to store Brax trajectory as HTML (or rasterized video)
     """
     def __init__(self, env: benv.Env, directory: Optional[str]=None, height: int=480,
                  video_callable: Optional[Callable[[int], bool]]=None,
-                 jit: bool=True):
+                 jit: bool=True, budget: Optional[RecordingBudget]=None,
+                 backend: str="html", width: Optional[int]=None,
+                 ssaa: int=2):
         r"""
         Initialize HTML class
 
@@ -106,7 +402,7 @@ class BraxHTML(benv.Wrapper):
         env : Brax.envs.Env
             Environment to be wrapped
         directory : str, optional
-            Directory to store output html files.
+            Directory to store output files.
             If ``None`` (default), "%Y%m%d-%H%M%S" is used.
         height : int, optional
             Height in px. The default is ``480``.
@@ -114,15 +410,30 @@ class BraxHTML(benv.Wrapper):
             Function to determine whether each episode is recorded or not.
         jit : bool
             Whether wrap step/reset function with jax.jit
+        budget : gnwrapper.RecordingBudget, optional
+            Disk budget for recorded files.
+            If ``None`` (default), files are never deleted.
+        backend : {"html", "mp4", "webp"}, optional
+            Output format. "html" (default) is three.js viewer.
+            "mp4" and "webp" are videos rasterized on CPU.
+        width : int, optional
+            Video width in px. If ``None`` (default), ``height * 4 // 3``
+            is used. Ignored by "html" backend.
+        ssaa : int, optional
+            Supersampling factor of rasterization. ``1`` is about 4 times
+            faster than the default ``2``, but edges are jagged.
+            Ignored by "html" backend.
 
         Raises
         ------
-        ValueError: When ``env`` is wrapped with ``AutoReset``
+        ValueError: When ``env`` is wrapped with ``AutoReset``,
+                    or ``backend`` is unknown
         """
         RaiseWhenAutoReset(env)
         super().__init__(env)
 
-        self._html = _HTML(env.sys, directory, height, video_callable)
+        self._html = _recorder(backend, env.sys, directory, height,
+                               video_callable, budget, width, ssaa)
 
         def step(state, action):
             return self.env.step(state, action)
@@ -190,26 +501,71 @@ class BraxHTML(benv.Wrapper):
         """
         return self._html.recorded_episodes()
 
-    def display(self, episodes: Optional[Union[int, List[int]]]=None):
+    def display(self, episodes: Optional[Union[int, List[int]]]=None,
+                combined: bool=False):
+        """
+        Display saved htmls or videos
+
+        Parameters
+        ----------
+        episodes: int or list of ints or None
+            Episode number(s) to be displayed.
+            If ``None`` (default), all the episode will be displayed.
+        combined: bool, optional
+            If ``True``, show episodes in a single viewer, which loads
+            the system once and switches episodes by selector.
+            Only "html" backend supports it. The default is ``False``.
+
+        Raises
+        ------
+        ValueError: When ``combined=True`` with video backend
+        """
+        self._html.display(episodes, combined)
+
+    def flush(self):
         """
-        Display saved htmls
+        Save current (unfinished) episode
+        """
+        self._html.flush()
+
+    async def aflush(self):
+        """
+        Save current (unfinished) episode without blocking event loop
+
+        Rendering and writing run in the default executor.
+        """
+        await self._html.aflush()
+
+    async def adisplay(self, episodes: Optional[Union[int, List[int]]]=None,
+                       combined: bool=False):
+        """
+        Display saved htmls or videos without blocking event loop
+
+        Files are read in the default executor, and each html is shown
+        as soon as it is ready.
 
         Parameters
         ----------
         episodes: int or list of ints or None
             Episode number(s) to be displayed.
             If ``None`` (default), all the episode will be displayed.
+        combined: bool, optional
+            If ``True``, show episodes in a single viewer.
+            See ``display()``. The default is ``False``.
         """
-        self._html.display(episodes)
+        await self._html.adisplay(episodes, combined)
 
 
 class GymHTML(gym.Wrapper):
     """
-    HTML Wrapper to store Gym wrappered Brax trajectory as HTML
+    HTML Wrapper to store Gym wrappered Brax trajectory as HTML (or rasterized video)
     """
     def __init__(self, env: GymWrapper, directory: Optional[str]=None,
                  height: int=480,
-                 video_callable: Optional[Callable[[int], bool]]=None):
+                 video_callable: Optional[Callable[[int], bool]]=None,
+                 budget: Optional[RecordingBudget]=None,
+                 backend: str="html", width: Optional[int]=None,
+                 ssaa: int=2):
         r"""
         Initialize GymHTML class
 
@@ -218,20 +574,35 @@ class GymHTML(gym.Wrapper):
         env : Brax.envs.wrappers.GymWrapper
             Environment to be wrapped
         directory : str, optional
-            Directory to store output html files.
+            Directory to store output files.
             If ``None`` (default), "%Y%m%d-%H%M%S" is used.
         height : int, optional
             Height in px. The default is ``480``.
         video_callable: (int) -> bool, optional
             Function to determine whether each episode is recorded or not.
+        budget : gnwrapper.RecordingBudget, optional
+            Disk budget for recorded files.
+            If ``None`` (default), files are never deleted.
+        backend : {"html", "mp4", "webp"}, optional
+            Output format. "html" (default) is three.js viewer.
+            "mp4" and "webp" are videos rasterized on CPU.
+        width : int, optional
+            Video width in px. If ``None`` (default), ``height * 4 // 3``
+            is used. Ignored by "html" backend.
+        ssaa : int, optional
+            Supersampling factor of rasterization. ``1`` is about 4 times
+            faster than the default ``2``, but edges are jagged.
+            Ignored by "html" backend.
 
         Raises
         ------
-        ValueError: When ``env`` is wrapped with ``AutoReset``
+        ValueError: When ``env`` is wrapped with ``AutoReset``,
+                    or ``backend`` is unknown
         """
         RaiseWhenAutoReset(env._env)
         super().__init__(env)
-        self._html = _HTML(env._env.sys, directory, height, video_callable)
+        self._html = _recorder(backend, env._env.sys, directory, height,
+                               video_callable, budget, width, ssaa)
 
     def step(self, action):
         """
@@ -284,14 +655,56 @@ class GymHTML(gym.Wrapper):
         """
         return self._html.recorded_episodes()
 
-    def display(self, episodes: Optional[Union[int, List[int]]]=None):
+    def display(self, episodes: Optional[Union[int, List[int]]]=None,
+                combined: bool=False):
         """
-        Display saved htmls
+        Display saved htmls or videos
+
+        Parameters
+        ----------
+        episodes: int or list of ints or None
+            Episode number(s) to be displayed.
+            If ``None`` (default), all the episode will be displayed.
+        combined: bool, optional
+            If ``True``, show episodes in a single viewer, which loads
+            the system once and switches episodes by selector.
+            Only "html" backend supports it. The default is ``False``.
+
+        Raises
+        ------
+        ValueError: When ``combined=True`` with video backend
+        """
+        self._html.display(episodes, combined)
+
+    def flush(self):
+        """
+        Save current (unfinished) episode
+        """
+        self._html.flush()
+
+    async def aflush(self):
+        """
+        Save current (unfinished) episode without blocking event loop
+
+        Rendering and writing run in the default executor.
+        """
+        await self._html.aflush()
+
+    async def adisplay(self, episodes: Optional[Union[int, List[int]]]=None,
+                       combined: bool=False):
+        """
+        Display saved htmls or videos without blocking event loop
+
+        Files are read in the default executor, and each html is shown
+        as soon as it is ready.
 
         Parameters
         ----------
         episodes: int or list of ints or None
             Episode number(s) to be displayed.
             If ``None`` (default), all the episode will be displayed.
+        combined: bool, optional
+            If ``True``, show episodes in a single viewer.
+            See ``display()``. The default is ``False``.
         """
-        self._html.display(episodes)
+        await self._html.adisplay(episodes, combined)
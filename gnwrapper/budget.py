@@ -0,0 +1,162 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+__all__ = ["RecordingBudget"]
+
+
+class RecordingBudget:
+    """
+    Disk budget for recorded files with eviction
+
+    Recordings are registered by wrappers when they are written. When the
+    total size or the number of recordings exceeds the budget, recordings
+    are deleted one by one according to ``policy``.
+    The most recently added recording is never evicted alone, so that at
+    least one recording always remains.
+    """
+    _policies = ("lru", "best", "kth")
+
+    def __init__(self, max_bytes: Optional[int]=None,
+                 max_files: Optional[int]=None,
+                 policy: str="lru", k: int=10):
+        """
+        Initialize RecordingBudget class
+
+        Parameters
+        ----------
+        max_bytes : int, optional
+            Maximum total size of recordings in bytes. If ``None`` (default),
+            size is not limited.
+        max_files : int, optional
+            Maximum number of recordings. If ``None`` (default),
+            number is not limited.
+        policy : {"lru", "best", "kth"}, optional
+            Eviction policy. "lru" (default) evicts least recently
+            recorded/displayed one, "best" evicts the one with the lowest
+            episode return, "kth" evicts the oldest one whose episode
+            number is not a multiple of ``k`` first.
+        k : int, optional
+            Interval of episodes kept by "kth" policy. The default is ``10``.
+
+        Raises
+        ------
+        ValueError: When ``policy`` is unknown
+        """
+        if policy not in self._policies:
+            raise ValueError(f"Unknown policy: {policy}. " +
+                             f"Policy must be one of {self._policies}")
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.policy = policy
+        self.k = k
+
+        self._entries: Dict[Tuple[str, ...], dict] = {}
+        self._nbytes = 0
+        self._clock = 0
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Total size of tracked recordings in bytes
+        """
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def _over(self):
+        return (((self.max_bytes is not None) and
+                 (self._nbytes > self.max_bytes)) or
+                ((self.max_files is not None) and
+                 (len(self._entries) > self.max_files)))
+
+    def _victim(self):
+        entries = self._entries.items()
+        if self.policy == "lru":
+            return min(entries, key=lambda e: e[1]["used"])[0]
+
+        if self.policy == "best":
+            return min(entries,
+                       key=lambda e: (-float("inf") if e[1]["score"] is None
+                                      else e[1]["score"], e[1]["added"]))[0]
+
+        # kth
+        return min(entries,
+                   key=lambda e: (e[1]["episode"] % self.k == 0,
+                                  e[1]["added"]))[0]
+
+    def add(self, paths: Tuple[str, ...], *, episode: int,
+            score: Optional[float]=None) -> List[Tuple[str, ...]]:
+        """
+        Register new recording and evict old ones if over budget
+
+        Parameters
+        ----------
+        paths : tuple of str
+            Files belonging to the recording. Evicted together.
+            ``None`` elements are ignored.
+        episode : int
+            Episode number
+        score : float, optional
+            Episode return used by "best" policy
+
+        Returns
+        -------
+        evicted : list of tuple of str
+            Evicted recordings, whose files are already deleted.
+        """
+        paths = tuple(paths)
+        if paths in self._entries:
+            self.remove(paths, delete=False)
+
+        nbytes = sum(os.path.getsize(p) for p in paths
+                     if (p is not None) and os.path.exists(p))
+        t = self._tick()
+        self._entries[paths] = {"episode": episode, "score": score,
+                                "nbytes": nbytes, "added": t, "used": t}
+        self._nbytes += nbytes
+
+        evicted = []
+        while self._over() and len(self._entries) > 1:
+            victim = self._victim()
+            self.remove(victim)
+            evicted.append(victim)
+        return evicted
+
+    def touch(self, paths: Tuple[str, ...]):
+        """
+        Mark recording as used (e.g. displayed) for "lru" policy
+
+        Parameters
+        ----------
+        paths : tuple of str
+            Files belonging to the recording
+        """
+        e = self._entries.get(tuple(paths))
+        if e is not None:
+            e["used"] = self._tick()
+
+    def remove(self, paths: Tuple[str, ...], delete: bool=True):
+        """
+        Stop tracking recording
+
+        Parameters
+        ----------
+        paths : tuple of str
+            Files belonging to the recording
+        delete : bool, optional
+            Whether delete files, too. The default is ``True``.
+        """
+        e = self._entries.pop(tuple(paths), None)
+        if e is None:
+            return
+        self._nbytes -= e["nbytes"]
+
+        if delete:
+            for p in paths:
+                if (p is not None) and os.path.exists(p):
+                    os.remove(p)
@@ -0,0 +1,154 @@
+import os
+from typing import List, Optional, Sequence
+
+import numpy as np
+from PIL import Image
+
+__all__ = ["save_animation"]
+
+
+_BITS = 5
+_LEVELS = 1 << _BITS
+_SHIFT = 8 - _BITS
+
+
+def _code(rgb: np.ndarray) -> np.ndarray:
+    # Pack RGB into 15bit code of 5bit/channel
+    rgb = rgb.astype(np.uint16) >> _SHIFT
+    return (rgb[..., 0] << (2 * _BITS)) | (rgb[..., 1] << _BITS) | rgb[..., 2]
+
+
+def _decode(code: np.ndarray) -> np.ndarray:
+    rgb = np.stack([(code >> (2 * _BITS)) & (_LEVELS - 1),
+                    (code >> _BITS) & (_LEVELS - 1),
+                    code & (_LEVELS - 1)], axis=-1)
+    # Center of each bin
+    return ((rgb << _SHIFT) + (1 << (_SHIFT - 1))).astype(np.uint8)
+
+
+def _palette(frames: np.ndarray, colors: int):
+    """
+    Build global palette and lookup table from frames
+
+    Returns
+    -------
+    palette : numpy.ndarray
+        (colors, 3) uint8 palette
+    lut : numpy.ndarray
+        (2**15,) uint8 lookup table from code to palette index
+    """
+    # Sub-sample pixels to bound cost for long and large animations
+    step = max(1, int(np.sqrt(frames[0].size // 3 * len(frames) / 2**20)))
+    counts = np.bincount(_code(frames[:, ::step, ::step]).ravel(),
+                         minlength=_LEVELS ** 3)
+
+    used = np.flatnonzero(counts)
+    top = used[np.argsort(counts[used])[::-1][:colors]]
+    palette = _decode(top)
+
+    # Nearest palette entry for every code: |a-b|^2 = |a|^2 - 2ab + |b|^2
+    allc = _decode(np.arange(_LEVELS ** 3)).astype(np.float32)
+    p = palette.astype(np.float32)
+    d = (np.sum(p * p, axis=1)[np.newaxis, :] - 2 * (allc @ p.T))
+    lut = np.argmin(d, axis=1).astype(np.uint8)
+    return palette, lut
+
+
+def _dedup(index: np.ndarray, durations: List[float]):
+    # Merge unchanged frames into previous one
+    keep = [0]
+    merged = [durations[0]]
+    for i in range(1, len(index)):
+        if np.array_equal(index[i], index[keep[-1]]):
+            merged[-1] += durations[i]
+        else:
+            keep.append(i)
+            merged.append(durations[i])
+    return index[keep], merged
+
+
+def save_animation(frames: Sequence[np.ndarray], path: str, *,
+                   interval: float=50,
+                   durations: Optional[Sequence[float]]=None,
+                   colors: int=255, loop: int=0,
+                   format: Optional[str]=None):
+    """
+    Save frames as animated GIF or WebP
+
+    Frames are quantized with a global palette, and unchanged regions
+    between consecutive frames are left to the previous frame, so that
+    only changed regions are encoded.
+
+    Parameters
+    ----------
+    frames : sequence of numpy.ndarray
+        RGB(A) images with the same shape
+    path : str
+        Output file path
+    interval : float, optional
+        Delay between frames in milliseconds. The default is ``50``.
+    durations : sequence of float, optional
+        Delay of each frame in milliseconds. If specified, ``interval``
+        is ignored.
+    colors : int, optional
+        Number of palette colors up to ``255``. The default is ``255``.
+    loop : int, optional
+        Number of loops. ``0`` (default) means infinite loop.
+    format : {"gif", "webp"}, optional
+        Output format. If ``None`` (default), inferred from ``path``.
+
+    Raises
+    ------
+    ValueError: When ``frames`` is empty or ``format`` is unknown
+    """
+    if len(frames) == 0:
+        raise ValueError("No frames to save")
+
+    if format is None:
+        format = os.path.splitext(path)[1][1:]
+    format = format.lower()
+    if format not in ("gif", "webp"):
+        raise ValueError(f"Unknown format: {format}. Format must be gif or webp")
+
+    if durations is None:
+        durations = [interval] * len(frames)
+    durations = [float(d) for d in durations]
+
+    frames = np.stack([np.asarray(f)[..., :3] for f in frames])
+    colors = int(np.clip(colors, 2, 255))
+
+    palette, lut = _palette(frames, colors)
+    index = lut[_code(frames)]
+    index, durations = _dedup(index, durations)
+
+    if format == "webp":
+        # libwebp encodes only changed sub-rectangles by itself.
+        images = [Image.fromarray(palette[i]) for i in index]
+        images[0].save(path, format="WEBP", save_all=True,
+                       append_images=images[1:], duration=durations,
+                       loop=loop, lossless=True)
+        return
+
+    # GIF: Index 255 is reserved as transparent (= unchanged) pixel.
+    transparent = 255
+    flat_palette = np.zeros((256, 3), dtype=np.uint8)
+    flat_palette[:len(palette)] = palette
+    flat_palette = flat_palette.ravel().tolist()
+
+    images = []
+    prev = None
+    for i in index:
+        img = i
+        if prev is not None:
+            img = np.where(i == prev, np.uint8(transparent), i)
+        prev = i
+
+        # Palette turns "L" image into "P" image.
+        im = Image.fromarray(img)
+        im.putpalette(flat_palette)
+        images.append(im)
+
+    images[0].save(path, format="GIF", save_all=True,
+                   append_images=images[1:], duration=durations,
+                   loop=loop, disposal=1, transparency=transparent,
+                   optimize=False)
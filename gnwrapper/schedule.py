@@ -0,0 +1,107 @@
+from typing import Optional
+
+__all__ = ["CaptureScheduler"]
+
+
+class CaptureScheduler:
+    """
+    Adaptive capture scheduler bounding rendering overhead
+
+    Step time and capture (render) cost are measured by wrappers. Each
+    step earns capture time of ``overhead`` times its step time, and each
+    capture spends its measured cost, so that captures are skipped while
+    the earned time is less than the expected capture cost.
+    Skipped captures are counted as dropped frames.
+    """
+    def __init__(self, overhead: float=0.05, smoothing: float=0.1,
+                 burst: float=2.0):
+        """
+        Initialize CaptureScheduler class
+
+        Parameters
+        ----------
+        overhead : float, optional
+            Target ratio of capture cost to step time.
+            The default is ``0.05`` (5%).
+        smoothing : float, optional
+            Weight of new measurement in exponential moving average of
+            capture cost. The default is ``0.1``.
+        burst : float, optional
+            Maximum stored capture time in units of capture cost, which
+            bounds consecutive captures after slow steps.
+            The default is ``2.0``.
+
+        Raises
+        ------
+        ValueError: When ``overhead`` is not positive
+        """
+        if overhead <= 0:
+            raise ValueError(f"overhead must be positive: {overhead}")
+        self.overhead = overhead
+        self.smoothing = smoothing
+        self.burst = burst
+
+        self.step_time = 0.0
+        self.capture_time = 0.0
+        self.captured = 0
+        self.dropped = 0
+
+        self._cost: Optional[float] = None
+        self._credit = 0.0
+
+    @property
+    def ratio(self) -> float:
+        """
+        Measured ratio of total capture time to total step time
+        """
+        if self.step_time == 0:
+            return 0.0
+        return self.capture_time / self.step_time
+
+    def step(self, elapsed: float):
+        """
+        Record step time
+
+        Parameters
+        ----------
+        elapsed : float
+            Step time in seconds
+        """
+        self.step_time += elapsed
+        self._credit += self.overhead * elapsed
+        if self._cost is not None:
+            self._credit = min(self._credit, self.burst * self._cost)
+
+    def ready(self) -> bool:
+        """
+        Whether the next capture fits into the overhead budget
+
+        The first capture is always allowed to measure its cost.
+        When this returns ``False``, the capture is counted as dropped.
+
+        Returns
+        -------
+        bool
+            ``True`` if capture should be done
+        """
+        if (self._cost is None) or (self._credit >= self._cost):
+            return True
+        self.dropped += 1
+        return False
+
+    def capture(self, elapsed: float):
+        """
+        Record capture cost
+
+        Parameters
+        ----------
+        elapsed : float
+            Capture time in seconds
+        """
+        self.capture_time += elapsed
+        self.captured += 1
+        self._credit -= elapsed
+        if self._cost is None:
+            self._cost = elapsed
+        else:
+            self._cost += self.smoothing * (elapsed - self._cost)
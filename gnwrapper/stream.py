@@ -0,0 +1,216 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+__all__ = ["MJPEGServer"]
+
+
+_BOUNDARY = "gnwrapperframe"
+
+
+class MJPEGServer:
+    """
+    Local HTTP server streaming the latest frame as MJPEG
+
+    Frames are encoded on a worker thread, and HTTP clients are served on
+    their own threads. Only the latest frame is kept, so that unencoded
+    frames are dropped when encoding is slower than pushing, and each
+    client skips frames when it is slower than encoding.
+
+    Endpoints
+    ---------
+    / : multipart/x-mixed-replace MJPEG stream
+    /frame.jpg : latest single frame
+    """
+    def __init__(self, host: str="127.0.0.1", port: int=8080,
+                 fps: float=10, quality: int=75):
+        """
+        Initialize MJPEGServer class and start threads
+
+        Parameters
+        ----------
+        host : str, optional
+            Host to bind. The default is ``"127.0.0.1"``.
+        port : int, optional
+            Port to bind. ``0`` means any free port. The default is ``8080``.
+        fps : float, optional
+            Maximum frame rate sent to each client. The default is ``10``.
+        quality : int, optional
+            JPEG quality. The default is ``75``.
+
+        Raises
+        ------
+        ValueError: When ``fps`` is not positive
+        """
+        if fps <= 0:
+            raise ValueError(f"fps must be positive: {fps}")
+        self.fps = fps
+        self.quality = quality
+
+        self._raw = None
+        self._raw_ready = threading.Condition()
+
+        self._jpeg = None
+        self._seq = 0
+        self._jpeg_ready = threading.Condition()
+
+        self._clients = 0
+        self._closed = False
+
+        # Bind first, so that no thread is left when binding fails.
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+
+        self._encoder = threading.Thread(target=self._encode, daemon=True)
+        self._encoder.start()
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        """
+        URL of MJPEG stream
+        """
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def clients(self) -> int:
+        """
+        Number of clients waiting for frames
+        """
+        return self._clients
+
+    def push(self, frame: np.ndarray):
+        """
+        Pass new frame to encoder
+
+        This doesn't block. Previous frame is dropped if it is not
+        encoded yet.
+
+        Parameters
+        ----------
+        frame : numpy.ndarray
+            RGB(A) image
+        """
+        with self._raw_ready:
+            self._raw = frame
+            self._raw_ready.notify()
+
+    def _encode(self):
+        while True:
+            with self._raw_ready:
+                while self._raw is None and not self._closed:
+                    self._raw_ready.wait()
+                if self._closed:
+                    return
+                frame, self._raw = self._raw, None
+
+            buf = io.BytesIO()
+            Image.fromarray(np.asarray(frame)[..., :3]).save(
+                buf, format="JPEG", quality=self.quality)
+
+            with self._jpeg_ready:
+                self._jpeg = buf.getvalue()
+                self._seq += 1
+                self._jpeg_ready.notify_all()
+
+    def _wait(self, seq: int, timeout: float):
+        # Wait for frame newer than ``seq``
+        with self._jpeg_ready:
+            self._jpeg_ready.wait_for(lambda: self._seq > seq or self._closed,
+                                      timeout)
+            return self._seq, self._jpeg
+
+    def _connect(self, n: int):
+        with self._jpeg_ready:
+            self._clients += n
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send_frame(self):
+                server._connect(1)
+                try:
+                    _, jpeg = server._wait(server._seq, 1.0)
+                finally:
+                    server._connect(-1)
+
+                if jpeg is None:
+                    self.send_error(503)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(jpeg)))
+                self.end_headers()
+                self.wfile.write(jpeg)
+
+            def _send_stream(self):
+                self.send_response(200)
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Content-Type",
+                                 f"multipart/x-mixed-replace; boundary={_BOUNDARY}")
+                self.end_headers()
+
+                seq = 0
+                last = -float("inf")
+                server._connect(1)
+                try:
+                    while not server._closed:
+                        wait = last + 1.0 / server.fps - time.perf_counter()
+                        if wait > 0:
+                            time.sleep(wait)
+
+                        new_seq, jpeg = server._wait(seq, 1.0)
+                        if (new_seq == seq) or (jpeg is None) or server._closed:
+                            continue
+                        seq = new_seq
+
+                        self.wfile.write(
+                            (f"--{_BOUNDARY}\r\n" +
+                             "Content-Type: image/jpeg\r\n" +
+                             f"Content-Length: {len(jpeg)}\r\n\r\n").encode())
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                        self.wfile.flush()
+                        last = time.perf_counter()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    server._connect(-1)
+
+            def do_GET(self):
+                if self.path == "/":
+                    self._send_stream()
+                elif self.path == "/frame.jpg":
+                    self._send_frame()
+                else:
+                    self.send_error(404)
+
+        return Handler
+
+    def close(self):
+        """
+        Stop server and encoder
+        """
+        if self._closed:
+            return
+        self._closed = True
+
+        with self._raw_ready:
+            self._raw_ready.notify_all()
+        with self._jpeg_ready:
+            self._jpeg_ready.notify_all()
+
+        self._server.shutdown()
+        self._server.server_close()
+        self._encoder.join()
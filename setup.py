@@ -17,7 +17,8 @@ else:
 setup(name="gym-notebook-wrapper",
       author="Yamada Hiroyuki",
       version="1.3.3",
-      install_requires=["gym","matplotlib","pyvirtualdisplay","ipython","moviepy"],
+      install_requires=["gym","matplotlib","pyvirtualdisplay","ipython","moviepy",
+                        "numpy","pillow"],
       extras_require={"test": ["brax"]},
       packages=find_packages(),
       url="https://github.com/ymd-h/gym-notebook-wrapper",
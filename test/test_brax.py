@@ -1,10 +1,17 @@
+import asyncio
+import json
 import os
 import unittest
 
 from brax import envs
+from brax.io import image
+import jax
+import numpy as np
 import brax.jumpy as jp
 
-from gnwrapper.brax import BraxHTML, GymHTML, _HTML, RaiseWhenAutoReset
+from gnwrapper import RecordingBudget
+from gnwrapper.brax import (BraxHTML, GymHTML, _HTML, _SYSTEM, _Rasterizer,
+                             RaiseWhenAutoReset)
 
 
 class TestBrax(unittest.TestCase):
@@ -109,6 +116,140 @@ class TestBrax(unittest.TestCase):
         self.assertEqual(ant.recorded_episodes(), [1])
         ant.display()
 
+    def test_async(self):
+        ant = BraxHTML(envs.create("ant", auto_reset=False, episode_length=20),
+                       directory="test_brax_async",
+                       video_callable=lambda ep: True)
+
+        rng = jp.random_prngkey(0)
+        rng, rng_use = jp.random_split(rng)
+        state = ant.reset(rng_use)
+        for _ in range(5):
+            rng, rng_use = jp.random_split(rng)
+            state = ant.step(state, jp.random_uniform(rng_use,(ant.action_size,)))
+
+        self.assertEqual(ant.recorded_episodes(), [])
+        asyncio.run(ant.aflush())
+        self.assertEqual(ant.recorded_episodes(), [1])
+        asyncio.run(ant.adisplay())
+
+    def test_video(self):
+        for backend in ["mp4", "webp"]:
+            with self.subTest(backend=backend):
+                ant = BraxHTML(envs.create("ant", auto_reset=False,
+                                           episode_length=5),
+                               directory=f"test_brax_{backend}",
+                               video_callable=lambda ep: True,
+                               backend=backend, height=60)
+
+                rng = jp.random_prngkey(0)
+                rng, rng_use = jp.random_split(rng)
+                state = ant.reset(rng_use)
+                while True:
+                    rng, rng_use = jp.random_split(rng)
+                    state = ant.step(state,
+                                     jp.random_uniform(rng_use,(ant.action_size,)))
+                    if state.done:
+                        break
+
+                self.assertEqual(ant.recorded_episodes(), [1])
+                self.assertTrue(os.path.exists(os.path.join(f"test_brax_{backend}",
+                                                            f"episode-1.{backend}")))
+                ant.display()
+
+        with self.assertRaises(ValueError):
+            BraxHTML(envs.create("ant", auto_reset=False), backend="gif")
+
+    def test_rasterizer(self):
+        ant = envs.create("ant", auto_reset=False)
+
+        rng = jp.random_prngkey(0)
+        rng, rng_use = jp.random_split(rng)
+        state = ant.reset(rng_use)
+        qps = []
+        for _ in range(3):
+            rng, rng_use = jp.random_split(rng)
+            state = ant.step(state, jp.random_uniform(rng_use,(ant.action_size,)))
+            qps.append(state.qp)
+        qps = jax.device_get(qps)
+
+        # Same images as brax, with the scene built only once
+        for ssaa in [1, 2]:
+            with self.subTest(ssaa=ssaa):
+                rasterizer = _Rasterizer(ant.sys, 40, 30, ssaa)
+                frames = rasterizer(qps)
+                scene = rasterizer._scene
+                frames += rasterizer(qps)
+                self.assertIs(rasterizer._scene, scene)
+
+                for qp, frame in zip(qps + qps, frames):
+                    np.testing.assert_array_equal(
+                        frame, image.render_array(ant.sys, qp, 40, 30,
+                                                  ssaa=ssaa))
+
+    def test_budget(self):
+        ant = BraxHTML(envs.create("ant", auto_reset=False, episode_length=5),
+                       directory="test_brax_budget",
+                       video_callable=lambda ep: True,
+                       budget=RecordingBudget(max_files=2))
+
+        rng = jp.random_prngkey(0)
+        for _ in range(3):
+            rng, rng_use = jp.random_split(rng)
+            state = ant.reset(rng_use)
+
+            while True:
+                rng, rng_use = jp.random_split(rng)
+                state = ant.step(state,
+                                 jp.random_uniform(rng_use,(ant.action_size,)))
+                if state.done:
+                    break
+
+        self.assertEqual(ant.recorded_episodes(), [2, 3])
+        ant.display()
+
+    def test_combined(self):
+        ant = BraxHTML(envs.create("ant", auto_reset=False, episode_length=5),
+                       directory="test_brax_combined",
+                       video_callable=lambda ep: True)
+
+        rng = jp.random_prngkey(0)
+        for _ in range(3):
+            rng, rng_use = jp.random_split(rng)
+            state = ant.reset(rng_use)
+
+            while True:
+                rng, rng_use = jp.random_split(rng)
+                state = ant.step(state,
+                                 jp.random_uniform(rng_use,(ant.action_size,)))
+                if state.done:
+                    break
+
+        files = ant._html._files(None)
+        combined = ant._html._combine(files).data
+
+        # System config is embedded only once.
+        config = json.dumps(json.loads(_SYSTEM.search(
+            open(files[0]).read()).group(1))["config"], separators=(",", ":"))
+        self.assertEqual(combined.count(config), 1)
+        self.assertEqual(combined.count("new Viewer("), 1)
+        self.assertEqual(combined.count("<option>"), 3)
+
+        # Single iframe whose document is replaced for each episode, so that
+        # the previous viewer is released by browser as a whole.
+        self.assertEqual(combined.count("<iframe"), 1)
+        self.assertIn("frame.srcdoc = ", combined)
+        self.assertEqual(combined.count("</script>"), 1)
+        self.assertNotIn("<!-- system json goes here -->", combined)
+        self.assertLess(len(combined), sum(os.path.getsize(f) for f in files))
+
+        ant.display(combined=True)
+        asyncio.run(ant.adisplay([2, 3], combined=True))
+
+        video = BraxHTML(envs.create("ant", auto_reset=False),
+                         directory="test_brax_combined_mp4", backend="mp4")
+        with self.assertRaises(ValueError):
+            video._html._combine(files)
 
 
 if __name__ == "__main__":
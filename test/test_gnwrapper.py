@@ -1,10 +1,21 @@
+import asyncio
+import io
+import json
 import os
+import time
 import unittest
+import urllib.error
+import urllib.request
 from unittest.mock import MagicMock, patch
 import re
+import threading
+import tracemalloc
 
 import gnwrapper
+from gnwrapper.export import save_animation
 import gym
+import numpy as np
+from PIL import Image, ImageSequence
 
 
 version = tuple(int(v) for v in gym.__version__.split("."))
@@ -27,6 +38,58 @@ class TestVirtualDisplay(unittest.TestCase):
         self.assertIsNotNone(env.render())
 
 
+class TestPrewarm(unittest.TestCase):
+    def setUp(self):
+        self.instance = gnwrapper._VirtualDisplaySingleton.__dict__.get("_instance")
+        if self.instance is not None:
+            del gnwrapper._VirtualDisplaySingleton._instance
+
+    def tearDown(self):
+        gnwrapper.set_display_hook(None)
+        if "_instance" in gnwrapper._VirtualDisplaySingleton.__dict__:
+            del gnwrapper._VirtualDisplaySingleton._instance
+        if self.instance is not None:
+            gnwrapper._VirtualDisplaySingleton._instance = self.instance
+
+    def test_prewarm(self):
+        go = threading.Event()
+
+        class SlowDisplay:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            def start(self):
+                go.wait()
+
+        hook = MagicMock()
+        gnwrapper.set_display_hook(hook)
+        with patch("gnwrapper.Display", SlowDisplay):
+            gnwrapper.prewarm()
+
+            # Construction doesn't wait display
+            env = gnwrapper.VirtualDisplay(make("CartPole-v1"))
+            env.reset()
+            self.assertFalse(env._display._ready.is_set())
+            hook.assert_not_called()
+
+            go.set()
+            self.assertIsNotNone(env.render())
+            hook.assert_called_once()
+            self.assertGreaterEqual(hook.call_args[0][0], 0)
+
+    def test_error(self):
+        class BrokenDisplay:
+            def __init__(self, *args, **kwargs):
+                raise FileNotFoundError("Xvfb")
+
+        with patch("gnwrapper.Display", BrokenDisplay):
+            gnwrapper.prewarm()
+            env = gnwrapper.VirtualDisplay(make("CartPole-v1"))
+            env.reset()
+            with self.assertRaises(FileNotFoundError):
+                env.render()
+
+
 class TestAnimation(unittest.TestCase):
     def test_render(self):
         env = gnwrapper.Animation(make("CartPole-v1"))
@@ -45,6 +108,98 @@ class TestAnimation(unittest.TestCase):
             if d:
                 env.reset()
 
+    def test_display_handle(self):
+        env = gnwrapper.Animation(make("CartPole-v1"))
+        env.reset()
+
+        handle = MagicMock()
+        with patch("IPython.display.display",
+                   MagicMock(return_value=handle)) as display, \
+             patch("IPython.display.clear_output") as clear_output:
+            for _ in range(3):
+                env.step(env.action_space.sample())
+                env.render()
+
+        display.assert_called_once()
+        self.assertEqual(handle.update.call_count, 2)
+        clear_output.assert_not_called()
+
+    def test_coalesce(self):
+        env = gnwrapper.Animation(make("CartPole-v1"), min_interval=1e+6)
+        env.reset()
+
+        handle = MagicMock()
+        with patch("IPython.display.display",
+                   MagicMock(return_value=handle)) as display:
+            for _ in range(3):
+                env.step(env.action_space.sample())
+                env.render()
+
+            display.assert_called_once()
+            handle.update.assert_not_called()
+
+            env.close()
+            handle.update.assert_called_once()
+
+    def test_double_buffer(self):
+        env = gnwrapper.Animation(make("CartPole-v1"), double_buffer=True)
+        env.reset()
+
+        handle = MagicMock()
+        with patch("IPython.display.display",
+                   MagicMock(return_value=handle)) as display:
+            # Same image is not sent again
+            env.render()
+            env.render()
+
+        display.assert_called_once()
+        handle.update.assert_not_called()
+
+    def test_figure_memory(self):
+        import matplotlib.pyplot as plt
+
+        env = gnwrapper.Animation(make("CartPole-v1"))
+        env.reset()
+
+        # MagicMock keeps all call arguments, so that use plain stubs.
+        class Handle:
+            def update(self, obj):
+                pass
+
+        frame = np.zeros((40, 60, 3), dtype=np.uint8)
+        def run(n):
+            for i in range(n):
+                frame[:] = i % 256
+                env.render()
+
+        with patch("IPython.display.display", lambda *args, **kwargs: Handle()), \
+             patch("gnwrapper._render", lambda *args, **kwargs: frame):
+            run(1)
+            fig = env._fig
+            # Small figure to keep this test fast
+            fig.set_size_inches(1, 1)
+            fig.set_dpi(40)
+
+            tracemalloc.start()
+            try:
+                # Warm up caches while tracing, then compare later windows
+                run(100)
+                before = tracemalloc.get_traced_memory()[0]
+                run(200)
+                middle = tracemalloc.get_traced_memory()[0]
+                run(200)
+                after = tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+
+        self.assertIs(env._fig, fig)
+        self.assertEqual(plt.get_fignums(), [])
+        self.assertLess(middle - before, 2**19)
+        self.assertLess(after - middle, 2**19)
+
+        env.close()
+        self.assertIsNone(env._fig)
+
 class TestLoopAnimation(unittest.TestCase):
     def test_render(self):
         env = gnwrapper.LoopAnimation(make("CartPole-v1"))
@@ -65,6 +220,217 @@ class TestLoopAnimation(unittest.TestCase):
 
         env.display()
 
+    def test_adisplay(self):
+        env = gnwrapper.LoopAnimation(make("CartPole-v1"))
+
+        env.reset()
+        for _ in range(10):
+            env.step(env.action_space.sample())
+            env.render()
+
+        with patch("IPython.display.display") as display:
+            asyncio.run(env.adisplay())
+        display.assert_called_once()
+
+    def test_save(self):
+        env = gnwrapper.LoopAnimation(make("CartPole-v1"))
+
+        env.reset()
+        for _ in range(20):
+            env.step(env.action_space.sample())
+            env.render()
+
+        for ext in ["gif", "webp"]:
+            with self.subTest(format=ext):
+                path = f"test_loop_animation.{ext}"
+                env.save(path)
+                self.assertTrue(os.path.exists(path))
+
+        with self.assertRaises(ValueError):
+            env.save("test_loop_animation.mp4")
+
+    def test_scheduler(self):
+        scheduler = gnwrapper.CaptureScheduler(overhead=1e-9)
+        env = gnwrapper.LoopAnimation(make("CartPole-v1"), scheduler=scheduler)
+
+        env.reset()
+        for _ in range(10):
+            env.step(env.action_space.sample())
+            env.render()
+
+        # Only the first render fits into the budget.
+        self.assertEqual(scheduler.captured, 1)
+        self.assertEqual(scheduler.dropped, 9)
+        self.assertEqual(len(env._img), 1)
+
+        path = "test_loop_animation_scheduler.gif"
+        env.save(path, interval=50)
+        with Image.open(path) as img:
+            self.assertEqual(img.n_frames, 1)
+            self.assertEqual(img.info["duration"], 500)
+
+        with patch("IPython.display.display") as display:
+            env.display()
+        display.assert_called_once()
+
+    def test_figure_reuse(self):
+        import matplotlib.pyplot as plt
+
+        env = gnwrapper.LoopAnimation(make("CartPole-v1"))
+
+        env.reset()
+        for _ in range(5):
+            env.step(env.action_space.sample())
+            env.render()
+
+        with patch("IPython.display.display") as display:
+            env.display()
+            fig = env._fig
+            env.display(dpi=36)
+        self.assertEqual(display.call_count, 2)
+        self.assertIs(env._fig, fig)
+        self.assertEqual(plt.get_fignums(), [])
+
+        env.close()
+        self.assertIsNone(env._fig)
+
+
+class TestCaptureScheduler(unittest.TestCase):
+    def test_overhead(self):
+        scheduler = gnwrapper.CaptureScheduler(overhead=0.1)
+
+        # Step: 10ms, Capture: 10ms
+        n = 1000
+        for _ in range(n):
+            scheduler.step(0.01)
+            if scheduler.ready():
+                scheduler.capture(0.01)
+
+        self.assertEqual(scheduler.captured + scheduler.dropped, n)
+        self.assertAlmostEqual(scheduler.ratio, 0.1, delta=0.01)
+
+    def test_first(self):
+        scheduler = gnwrapper.CaptureScheduler(overhead=0.01)
+        self.assertTrue(scheduler.ready())
+        scheduler.capture(1.0)
+        scheduler.step(1.0)
+        self.assertFalse(scheduler.ready())
+        self.assertEqual(scheduler.dropped, 1)
+
+    def test_burst(self):
+        scheduler = gnwrapper.CaptureScheduler(overhead=0.1, burst=2.0)
+        scheduler.capture(0.01)
+
+        # Long step doesn't allow many consecutive captures.
+        scheduler.step(100.0)
+        captured = 0
+        while scheduler.ready():
+            scheduler.capture(0.01)
+            captured += 1
+        self.assertEqual(captured, 2)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            gnwrapper.CaptureScheduler(overhead=0)
+
+class TestAnimationScheduler(unittest.TestCase):
+    def test_render(self):
+        scheduler = gnwrapper.CaptureScheduler(overhead=1e-9)
+        env = gnwrapper.Animation(make("CartPole-v1"), scheduler=scheduler)
+        env.reset()
+
+        with patch("IPython.display.display") as display:
+            for _ in range(5):
+                env.step(env.action_space.sample())
+                env.render()
+
+        display.assert_called_once()
+        self.assertEqual(scheduler.captured, 1)
+        self.assertEqual(scheduler.dropped, 4)
+
+class TestSaveAnimation(unittest.TestCase):
+    def test_roundtrip(self):
+        frames = []
+        for t in range(10):
+            f = np.full((40, 60, 3), 255, dtype=np.uint8)
+            f[t:t+5, 2*t:2*t+5] = (200, 30, 30)
+            frames.append(f)
+        frames.append(frames[-1].copy())
+
+        for ext in ["gif", "webp"]:
+            with self.subTest(format=ext):
+                path = f"test_save_animation.{ext}"
+                save_animation(frames, path, interval=40)
+
+                decoded = []
+                with Image.open(path) as im:
+                    for fr in ImageSequence.Iterator(im):
+                        rgb = np.asarray(fr.convert("RGB"), dtype=int)
+                        decoded.extend([rgb] * round(fr.info["duration"] / 40))
+
+                self.assertEqual(len(decoded), len(frames))
+                for d, f in zip(decoded, frames):
+                    np.testing.assert_allclose(d, f, atol=8)
+
+    def test_empty(self):
+        with self.assertRaises(ValueError):
+            save_animation([], "test_empty.gif")
+
+
+class TestStream(unittest.TestCase):
+    def test_stream(self):
+        env = gnwrapper.Stream(make("CartPole-v1"), port=0, fps=100)
+        env.reset()
+
+        # No client, no capture
+        env.step(env.action_space.sample())
+        self.assertEqual(env.server._seq, 0)
+
+        with urllib.request.urlopen(env.url, timeout=10) as stream:
+            self.assertIn("multipart/x-mixed-replace",
+                          stream.headers["Content-Type"])
+            while env.server.clients == 0:
+                time.sleep(0.01)
+
+            for _ in range(3):
+                time.sleep(0.02)
+                env.step(env.action_space.sample())
+
+            self.assertTrue(stream.readline().startswith(b"--"))
+            headers = {}
+            while (line := stream.readline().strip()):
+                k, v = line.decode().split(": ")
+                headers[k] = v
+            self.assertEqual(headers["Content-Type"], "image/jpeg")
+
+            jpeg = stream.read(int(headers["Content-Length"]))
+            self.assertEqual(Image.open(io.BytesIO(jpeg)).format, "JPEG")
+
+        env.close()
+
+    def test_not_found(self):
+        env = gnwrapper.Stream(make("CartPole-v1"), port=0)
+        with self.assertRaises(urllib.error.HTTPError):
+            urllib.request.urlopen(env.url + "unknown", timeout=10)
+        env.close()
+
+    def test_bind_error(self):
+        env = gnwrapper.Stream(make("CartPole-v1"), port=0)
+        port = env.server._server.server_address[1]
+
+        n = threading.active_count()
+        with self.assertRaises(OSError):
+            gnwrapper.Stream(make("CartPole-v1"), port=port)
+        self.assertEqual(threading.active_count(), n)
+        env.close()
+
+    def test_invalid_fps(self):
+        for fps in [0, -1]:
+            with self.subTest(fps=fps):
+                with self.assertRaises(ValueError):
+                    gnwrapper.Stream(make("CartPole-v1"), port=0, fps=fps)
+
+
 class TestMonitor(unittest.TestCase):
     def test_display(self):
         env = gnwrapper.Monitor(make('CartPole-v1'),directory="./")
@@ -234,6 +600,332 @@ class TestMonitor(unittest.TestCase):
         env.close()
         env.display()
 
+    def test_gallery(self):
+        env = gnwrapper.Monitor(make('CartPole-v1'),
+                                directory="./test_gallery/",
+                                video_callable=lambda ep: True,
+                                poster=True)
+        env.reset()
+
+        for _ in range(100):
+            ret = env.step(env.action_space.sample())
+            if len(ret) == 4:
+                o, r, d, i = ret
+            else:
+                o, r, term, trunc, i = ret
+                d = term | trunc
+
+            if d:
+                env.reset()
+
+        with patch("IPython.display.display") as display:
+            env.display(gallery=True)
+
+        display.assert_called_once()
+        gallery = display.call_args[0][0].data
+        self.assertNotIn("data:video/mp4", gallery)
+        self.assertIn('preload="none"', gallery)
+        for f in env.videos:
+            with self.subTest(file=f[0]):
+                self.assertEqual(len(f), 2)
+                self.assertTrue(os.path.exists(env.posters[f[0]]))
+                self.assertIn(os.path.basename(f[0]), gallery)
+                self.assertIn("data:image/jpeg;base64", gallery)
+
+    def test_no_poster(self):
+        env = gnwrapper.Monitor(make('CartPole-v1'),
+                                directory="./test_no_poster/",
+                                video_callable=lambda ep: True)
+        env.reset()
+        for _ in range(5):
+            env.step(env.action_space.sample())
+
+        with patch("IPython.display.display") as display:
+            env.display(gallery=True)
+
+        self.assertEqual(len(env.videos), 1)
+        mp4, meta = env.videos[0]
+        self.assertEqual(env.posters, {})
+        self.assertFalse(any(f.endswith(".poster.jpg")
+                             for f in os.listdir("./test_no_poster/")))
+        self.assertNotIn("data:image/jpeg;base64",
+                         display.call_args[0][0].data)
+
+    def test_adisplay(self):
+        env = gnwrapper.Monitor(make('CartPole-v1'),
+                                directory="./test_adisplay/",
+                                video_callable=lambda ep: True)
+        env.reset()
+        for _ in range(5):
+            env.step(env.action_space.sample())
+
+        asyncio.run(env.aflush())
+        self.assertEqual(len(env.videos), 1)
+        self.assertTrue(os.path.exists(env.videos[0][0]))
+
+        env.reset()
+        for _ in range(5):
+            env.step(env.action_space.sample())
+
+        with patch("IPython.display.display") as display:
+            asyncio.run(env.adisplay(reset=True))
+        self.assertEqual(display.call_count, 4)
+        self.assertEqual(len(env.videos), 0)
+
+    def test_segment(self):
+        env = gnwrapper.Monitor(make('CartPole-v1'),
+                                directory="./test_segment/",
+                                video_callable=lambda ep: ep == 0,
+                                segment_length=5)
+        env.reset(seed=0)
+
+        for _ in range(7):
+            env.step(0)
+
+        # Finished segment is available while episode is running
+        self.assertEqual(len(env.videos), 1)
+        manifest = os.path.splitext(env.videos[0][0])[0] + ".manifest.json"
+        with open(manifest) as f:
+            m = json.load(f)
+        self.assertFalse(m["complete"])
+        self.assertEqual(len(m["segments"]), 1)
+
+        # Running segment is flushed, and recording continues
+        env.display()
+        self.assertEqual(len(env.videos), 2)
+        self.assertTrue(env.recording)
+
+        d = False
+        while not d:
+            ret = env.step(0)
+            if len(ret) == 4:
+                o, r, d, i = ret
+            else:
+                o, r, term, trunc, i = ret
+                d = term | trunc
+        env.reset()
+
+        with open(manifest) as f:
+            m = json.load(f)
+        self.assertTrue(m["complete"])
+        self.assertEqual(len(m["segments"]), len(env.videos))
+        self.assertEqual(sum(s["frames"] for s in m["segments"]),
+                         1 + env.step_id)
+        for f in env.videos:
+            with self.subTest(file=f[0]):
+                self.assertTrue(os.path.exists(f[0]))
+
+    def test_segment_keeps_env(self):
+        class CountClose(gym.Wrapper):
+            closed = 0
+            def close(self):
+                CountClose.closed += 1
+                return super().close()
+
+        env = gnwrapper.Monitor(CountClose(make('CartPole-v1')),
+                                directory="./test_segment_keeps_env/",
+                                video_callable=lambda ep: ep == 0,
+                                segment_length=2)
+        env.reset(seed=0)
+        for _ in range(5):
+            env.step(0)
+        env.display()
+
+        self.assertGreater(len(env.videos), 1)
+        self.assertEqual(CountClose.closed, 0)
+
+    def test_segment_close(self):
+        env = gnwrapper.Monitor(make('CartPole-v1'),
+                                directory="./test_segment_close/",
+                                video_callable=lambda ep: ep == 0,
+                                segment_length=2)
+        env.reset(seed=0)
+        manifest = os.path.splitext(env.video_recorder.path)[0] + ".manifest.json"
+
+        # Segment is full just before close()
+        for _ in range(3):
+            env.step(0)
+        self.assertIsNone(env.video_recorder)
+        self.assertEqual(env._segment_manifest, {})
+        env.close()
+
+        with open(manifest) as f:
+            m = json.load(f)
+        self.assertTrue(m["complete"])
+        self.assertEqual([s["path"] for s in m["segments"]],
+                         [os.path.basename(v[0]) for v in env.videos])
+
+        # No empty segment is left
+        meta = [f for f in os.listdir("./test_segment_close/")
+                if f.endswith(".meta.json")]
+        self.assertEqual(len(meta), len(m["segments"]))
+
+    def test_segment_budget(self):
+        env = gnwrapper.Monitor(make('CartPole-v1'),
+                                directory="./test_segment_budget/",
+                                video_callable=lambda ep: ep == 0,
+                                segment_length=2,
+                                budget=gnwrapper.RecordingBudget(max_files=2))
+        env.reset(seed=0)
+        manifest = os.path.splitext(env.video_recorder.path)[0] + ".manifest.json"
+
+        d = False
+        while not d:
+            ret = env.step(0)
+            if len(ret) == 4:
+                o, r, d, i = ret
+            else:
+                o, r, term, trunc, i = ret
+                d = term | trunc
+        env.reset()
+
+        self.assertEqual(len(env.videos), 2)
+        with open(manifest) as f:
+            m = json.load(f)
+        self.assertTrue(m["complete"])
+        self.assertEqual([s["path"] for s in m["segments"]],
+                         [os.path.basename(v[0]) for v in env.videos])
+        for s in m["segments"]:
+            with self.subTest(segment=s["path"]):
+                self.assertTrue(os.path.exists(
+                    os.path.join("test_segment_budget", s["path"])))
+
+    def test_budget(self):
+        budget = gnwrapper.RecordingBudget(max_files=2)
+        env = gnwrapper.Monitor(make('CartPole-v1'),
+                                directory="./test_budget/",
+                                video_callable=lambda ep: True,
+                                budget=budget)
+        env.reset()
+
+        n_episode = 0
+        while n_episode < 4:
+            ret = env.step(env.action_space.sample())
+            if len(ret) == 4:
+                o, r, d, i = ret
+            else:
+                o, r, term, trunc, i = ret
+                d = term | trunc
+
+            if d:
+                env.reset()
+                n_episode += 1
+
+        env.display()
+        self.assertEqual(len(env.videos), 2)
+        self.assertEqual(len(budget), 2)
+        for f in env.videos:
+            with self.subTest(file=f[0]):
+                self.assertTrue(os.path.exists(f[0]))
+
+        mp4 = [f for f in os.listdir("./test_budget/") if f.endswith(".mp4")]
+        self.assertEqual(len(mp4), 2)
+
+
+class TestRecordingBudget(unittest.TestCase):
+    def _files(self, d, n, size=10):
+        os.makedirs(d, exist_ok=True)
+        ret = []
+        for i in range(n):
+            f = os.path.join(d, f"{i}.bin")
+            with open(f, "wb") as fout:
+                fout.write(b"0" * size)
+            ret.append((f,))
+        return ret
+
+    def test_policy(self):
+        with self.assertRaises(ValueError):
+            gnwrapper.RecordingBudget(policy="unknown")
+
+    def test_lru(self):
+        files = self._files("./test_budget_lru/", 4)
+        budget = gnwrapper.RecordingBudget(max_bytes=25, policy="lru")
+
+        self.assertEqual(budget.add(files[0], episode=0), [])
+        self.assertEqual(budget.add(files[1], episode=1), [])
+        budget.touch(files[0])
+        self.assertEqual(budget.add(files[2], episode=2), [files[1]])
+        self.assertFalse(os.path.exists(files[1][0]))
+        self.assertEqual(budget.nbytes, 20)
+
+    def test_best(self):
+        files = self._files("./test_budget_best/", 4)
+        budget = gnwrapper.RecordingBudget(max_files=2, policy="best")
+
+        budget.add(files[0], episode=0, score=5.0)
+        budget.add(files[1], episode=1, score=1.0)
+        self.assertEqual(budget.add(files[2], episode=2, score=3.0), [files[1]])
+        self.assertEqual(budget.add(files[3], episode=3, score=0.0), [files[3]])
+        self.assertTrue(os.path.exists(files[0][0]))
+        self.assertTrue(os.path.exists(files[2][0]))
+
+    def test_kth(self):
+        files = self._files("./test_budget_kth/", 4)
+        budget = gnwrapper.RecordingBudget(max_files=2, policy="kth", k=2)
+
+        budget.add(files[0], episode=0)
+        budget.add(files[1], episode=1)
+        self.assertEqual(budget.add(files[2], episode=2), [files[1]])
+        self.assertEqual(budget.add(files[3], episode=3), [files[3]])
+        self.assertTrue(os.path.exists(files[0][0]))
+        self.assertTrue(os.path.exists(files[2][0]))
+
+    def test_keep_latest(self):
+        files = self._files("./test_budget_latest/", 1, size=100)
+        budget = gnwrapper.RecordingBudget(max_bytes=10)
+
+        self.assertEqual(budget.add(files[0], episode=0), [])
+        self.assertEqual(len(budget), 1)
+
+
+class TestReplayMonitor(unittest.TestCase):
+    def test_replay(self):
+        env_fn = MagicMock(side_effect=lambda: make("CartPole-v1"))
+        env = gnwrapper.ReplayMonitor(make("CartPole-v1"), env_fn,
+                                      directory="./test_replay/",
+                                      video_callable=lambda ep: ep == 0)
+
+        env.reset()
+        frames = [env.render()]
+        for _ in range(10):
+            env.step(env.action_space.sample())
+            frames.append(env.render())
+        env.reset()
+        env.step(env.action_space.sample())
+
+        self.assertEqual(env.recorded_episodes(), [0])
+        with open("./test_replay/episode-0.json") as f:
+            log = json.load(f)
+        self.assertEqual(len(log["actions"]), 10)
+        env_fn.assert_not_called()
+
+        clip = MagicMock()
+        with patch("gnwrapper.ImageSequenceClip", clip):
+            env.video(0)
+        env_fn.assert_called_once()
+
+        replayed = clip.call_args[0][0]
+        self.assertEqual(len(replayed), len(frames))
+        for r, f in zip(replayed, frames):
+            np.testing.assert_array_equal(r, f)
+
+    def test_cache(self):
+        env_fn = MagicMock(side_effect=lambda: make("CartPole-v1"))
+        env = gnwrapper.ReplayMonitor(make("CartPole-v1"), env_fn,
+                                      directory="./test_replay_cache/",
+                                      video_callable=lambda ep: True)
+        env.reset(seed=42)
+        for _ in range(5):
+            env.step(env.action_space.sample())
+
+        env.display()
+        env.display(0)
+        env_fn.assert_called_once()
+        self.assertTrue(os.path.exists("./test_replay_cache/episode-0.mp4"))
+
+        with open("./test_replay_cache/episode-0.json") as f:
+            self.assertEqual(json.load(f)["seed"], 42)
+
 
 if __name__ == "__main__":
     unittest.main()